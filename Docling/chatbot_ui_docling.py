@@ -4,16 +4,31 @@ import sys
 from pathlib import Path
 
 import streamlit as st
-from qdrant_client import QdrantClient
-from fastembed import TextEmbedding
 from dotenv import load_dotenv
 
-# Ensure repo root is on sys.path for imports like gemini.py
+# Ensure repo root is on sys.path for imports like Docling.ingest_clean
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
-
-from gemini import get_assistant_response
+# Agent and retrieval helpers live under src
+if str(REPO_ROOT / "src") not in sys.path:
+    sys.path.append(str(REPO_ROOT / "src"))
+
+from agent.answer_cache import chunk_ids_for
+from agent.context import format_report, pack_context
+from agent.gemini import get_assistant_response, stream_assistant_response
+from agent.streaming import SourceLinkFilter
+from resources import get_embed_model, get_qdrant_client, get_reranker, get_sparse_model, warm_up
+from retrieval.cache import RetrievalCache
+from retrieval.multi_query import dedupe_hits, format_timings, multi_query_search
+from retrieval.search import (
+    NOISE_CONTENT_TYPES,
+    apply_score_threshold,
+    build_filter,
+    is_hybrid_collection,
+    search_collection,
+)
+from tracing import TRACING, span, stage_rows, start_trace
 
 # Optional: reuse crawler logic from ingest_clean if you want to run crawl on startup
 from Docling.ingest_clean import crawl_tarento
@@ -22,58 +37,104 @@ load_dotenv()
 st.set_page_config(page_title="Tarento AI Assistant", page_icon="T", layout="wide")
 
 COLLECTION_NAME = "tarento_web_data"
+# Render tokens as Groq produces them; set STREAM_RESPONSES=0 to wait for the full answer
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") != "0"
+# Retrieval settings; compare alternatives with benchmarks/retrieval_bench.py
+SEARCH_LIMIT = 8
+MIN_SCORE = 0.30
+# Search with the raw, history-condensed and keyword variants of each question
+# in one batch, then rerank with a local cross-encoder (RERANK=0 skips it)
+MULTI_QUERY = os.getenv("MULTI_QUERY", "1") != "0"
+RERANK = os.getenv("RERANK", "1") != "0"
+
+# Shared with Docling.ingest_clean through the resource registry; models load
+# in the background while the page renders.
+client_db = get_qdrant_client()
+warm_up(get_embed_model, get_reranker if MULTI_QUERY and RERANK else None)
+
 
 @st.cache_resource
-def initialize_system():
-    client = QdrantClient(
-        url=os.getenv("QDRANT_URL"),
-        api_key=os.getenv("QDRANT_API_KEY"),
-    )
-    model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-    return client, model
+def initialize_search_cache():
+    # Shared by every session; invalidated when ingestion bumps the collection version
+    return RetrievalCache(max_entries=512, ttl=900)
+
 
-client_db, embed_model = initialize_system()
+search_cache = initialize_search_cache()
 
 
-def search_knowledge_base(query):
+def current_sparse_model():
+    # Hybrid (dense + BM25) search switches on once ingestion stored sparse vectors;
+    # re-checked whenever ingestion bumps the collection version (a rebuild can flip it)
     try:
-        query_vec = list(embed_model.embed([query]))[0].tolist()
-        results = client_db.query_points(
-            collection_name=COLLECTION_NAME,
-            query=query_vec,
-            limit=8,
-        ).points
-        return [
-            {
-                "text": hit.payload.get("text", ""),
-                "url": hit.payload.get("source_url", ""),
-                "title": hit.payload.get("title", "Tarento Page"),
-                "score": hit.score,
-            }
-            for hit in results
-            if hit.score > 0.30
-        ]
+        hybrid = search_cache.versioned(
+            client_db, COLLECTION_NAME, "hybrid", lambda: is_hybrid_collection(client_db, COLLECTION_NAME)
+        )
+    except Exception:
+        return None
+    return get_sparse_model() if hybrid else None
+
+
+@st.cache_resource
+def initialize_reranker():
+    # Called on the first search, not at startup
+    if not (MULTI_QUERY and RERANK):
+        return None
+    try:
+        return get_reranker()
+    except Exception:
+        # Retrieval still works without it, just in vector-score order
+        return None
+
+
+def search_knowledge_base(query, history=None, sections=None, content_types=None, include_noise=False):
+    # Contact/legal footer pages are filtered out in Qdrant, not in the prompt
+    query_filter = build_filter(
+        sections=sections,
+        content_types=content_types,
+        exclude_content_types=None if include_noise else NOISE_CONTENT_TYPES,
+    )
+    try:
+        embed_model = get_embed_model()
+        if MULTI_QUERY:
+            hits, query_vec, timings = multi_query_search(
+                client_db,
+                embed_model,
+                COLLECTION_NAME,
+                query,
+                limit=SEARCH_LIMIT,
+                history=history,
+                reranker=initialize_reranker(),
+                cache=search_cache,
+                sparse_model=current_sparse_model(),
+                query_filter=query_filter,
+            )
+            st.session_state.retrieval_timings = timings
+            return apply_score_threshold(hits, MIN_SCORE), query_vec
+        hits, query_vec = search_collection(
+            client_db,
+            embed_model,
+            COLLECTION_NAME,
+            query,
+            limit=SEARCH_LIMIT,
+            cache=search_cache,
+            with_vector=True,
+            sparse_model=current_sparse_model(),
+            query_filter=query_filter,
+        )
+        return apply_score_threshold(hits, MIN_SCORE), query_vec
     except Exception as e:
         st.error(f"Search Error: {e}")
-        return []
+        return [], None
 
 
 def dedupe_citations(citations, max_items=5):
-    seen = set()
-    unique = []
-    for c in citations:
-        url = c.get("url")
-        if not url or url in seen:
-            continue
-        seen.add(url)
-        unique.append(c)
-        if len(unique) >= max_items:
-            break
-    return unique
-
-
-def get_response_and_link(prompt, context, instructions):
-    full_response = get_assistant_response(prompt, context, instructions)
+    return dedupe_hits([c for c in citations if c.get("url")], max_per_url=1, max_items=max_items)
+
+
+def get_response_and_link(prompt, context, instructions, query_vector=None, chunk_ids=None):
+    full_response = get_assistant_response(
+        prompt, context, instructions, query_vector=query_vector, chunk_ids=chunk_ids
+    )
     url_match = re.search(r"SOURCE_LINK:\s*\[?(https?://[^\s\]]+)\]?", full_response)
 
     clean_answer = full_response
@@ -86,6 +147,15 @@ def get_response_and_link(prompt, context, instructions):
     return clean_answer, source_url
 
 
+def stream_response_and_link(prompt, context, instructions, query_vector=None, chunk_ids=None):
+    link_filter = SourceLinkFilter()
+    tokens = stream_assistant_response(
+        prompt, context, instructions, query_vector=query_vector, chunk_ids=chunk_ids
+    )
+    answer = st.write_stream(link_filter.feed(tokens))
+    return (answer or "").strip(), link_filter.source_url
+
+
 def load_system_prompts():
     try:
         with open(REPO_ROOT / "prompts_v1.txt", "r") as f:
@@ -118,6 +188,12 @@ if "messages" not in st.session_state:
 
 st.title("Tarento AI Assistant (Docling)")
 
+cache_stats = search_cache.stats()
+st.sidebar.caption(
+    f"Retrieval cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+    f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries"
+)
+
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
@@ -135,27 +211,48 @@ if prompt := st.chat_input("Ask about Tarento..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
     st.chat_message("user").markdown(prompt)
 
-    with st.chat_message("assistant"):
+    # TRACING=1 times every stage of the turn
+    with st.chat_message("assistant"), start_trace("chat_turn", app="docling", multi_query=MULTI_QUERY) as trace:
         answer = ""
         current_link = None
         current_title = "Tarento Official"
 
         with st.status("Consulting Tarento Records...", expanded=False) as status:
-            citations = search_knowledge_base(prompt)
+            citations, query_vec = search_knowledge_base(prompt, history=st.session_state.messages)
             citation_list = dedupe_citations(citations, max_items=5)
+            if MULTI_QUERY and st.session_state.get("retrieval_timings"):
+                status.write(format_timings(st.session_state.retrieval_timings))
 
             if citations:
-                context_text = "\n".join(
-                    [f"Data: {c['text']} | Link: {c['url']}" for c in citations]
-                )
+                with span("context.build"):
+                    # Only the question-relevant sentences that fit CONTEXT_TOKENS
+                    packed = pack_context(prompt, citations, separator="\n")
+                    context_text = packed["text"]
+                status.write(format_report(packed))
                 status.update(label="Information retrieved.", state="complete")
             else:
                 context_text = "NO_CONTEXT_AVAILABLE"
                 status.update(label="No specific internal documents found.", state="complete")
 
-            answer, current_link = get_response_and_link(
-                prompt, context_text, STRICT_INSTRUCTIONS
+            if not STREAM_RESPONSES:
+                answer, current_link = get_response_and_link(
+                    prompt,
+                    context_text,
+                    STRICT_INSTRUCTIONS,
+                    query_vector=query_vec,
+                    chunk_ids=chunk_ids_for(citations),
+                )
+
+        if STREAM_RESPONSES:
+            answer, current_link = stream_response_and_link(
+                prompt,
+                context_text,
+                STRICT_INSTRUCTIONS,
+                query_vector=query_vec,
+                chunk_ids=chunk_ids_for(citations),
             )
+        else:
+            st.markdown(answer)
 
         if current_link:
             for c in citations:
@@ -163,7 +260,6 @@ if prompt := st.chat_input("Ask about Tarento..."):
                     current_title = c.get("title", "Tarento Official Page").split("|")[0].strip()
                     break
 
-        st.markdown(answer)
         if current_link:
             st.markdown(f"Info: [{current_title}]({current_link})")
         if citation_list:
@@ -183,3 +279,15 @@ if prompt := st.chat_input("Ask about Tarento..."):
                 "citations": citation_list,
             }
         )
+        if trace is not None:
+            trace.attrs["context_hits"] = len(citations)
+            if citations:
+                trace.attrs["prompt_tokens_saved"] = packed["saved_tokens"]
+
+    if trace is not None:
+        st.session_state.last_trace = trace.summary()
+
+if TRACING and st.session_state.get("last_trace"):
+    last_trace = st.session_state.last_trace
+    with st.sidebar.expander(f"Last turn: {last_trace['total_ms']:.0f} ms", expanded=False):
+        st.dataframe(stage_rows(last_trace), hide_index=True)
@@ -1,85 +1,140 @@
+import multiprocessing
 import os
-import uuid  
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
-import requests
 import streamlit as st
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from fastembed import TextEmbedding
-from langchain_docling import DoclingLoader
-from langchain_docling.loader import ExportType
-from qdrant_client import QdrantClient, models
+
+# Shared crawler helpers live under src/ingest
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+from ingest.aliases import ingest_target
+from ingest.crawler import CrawlEngine, iter_crawl
+from ingest.docling_convert import convert_page
+from ingest.embedding import HYBRID_SEARCH
+from ingest.fetch_cache import FetchCache
+from ingest.incremental import IncrementalIndex, chunk_point_id
+from ingest.pipeline import ingest_chunks
+from resources import get_embed_model, get_qdrant_client, get_sparse_model
+from retrieval.versioning import bump_collection_version
+from tracing import span, traced
 
 load_dotenv()
 
-# Initialize models manually to avoid the "Named Vector" conflict
-embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+# Models and the Qdrant client come from the shared registry on first use, so
+# importing this module (chatbot_ui_docling.py does) loads nothing heavy.
 COLLECTION_NAME = "tarento_web_data"
-
-
-def upload_to_qdrant_clean(documents, source_url=None, title=None):
-    points = []
-
-    print("Generating embeddings for Docling chunks...")
-    for doc in documents:
-        # Generate the vector for this specific chunk
-        vector = list(embed_model.embed([doc.page_content]))[0].tolist()
-
-        # Create a Qdrant Point
-        points.append(
-            models.PointStruct(
-                id=str(uuid.uuid4()),  # Generates a unique ID
-                vector=vector,  # This is an "unnamed" vector, matching your DB
-                payload={
-                    "text": doc.page_content,
-                    "source_url": source_url or doc.metadata.get("source", "https://www.tarento.com"),
-                    "title": title or doc.metadata.get("title", "Tarento Page"),
-                },
-            )
-        )
-
-    print(f"Upserting {len(points)} points...")
-    client.upsert(collection_name=COLLECTION_NAME, points=points)
-    print("Success! Docling data is now in your collection.")
-    return len(points)
-
-
-def crawl_tarento(seed_url="https://www.tarento.com", limit=40, status_cb=None):
-    visited = set()
-    to_visit = [seed_url]
+# Both Firecrawl ingesters (ingest_data.py) write here too
+INGEST_SOURCE = "docling"
+
+# Docling conversion is CPU-bound, so it runs in a process pool while the
+# crawl keeps fetching on its own thread.
+DOCLING_WORKERS = int(os.getenv("DOCLING_WORKERS", os.cpu_count() or 1))
+FETCH_CONCURRENCY = 8
+
+
+@traced("ingest", source="docling")
+def crawl_tarento(
+    seed_url="https://www.tarento.com", limit=40, status_cb=None, offline=False, workers=None, cache=None, rebuild=False
+):
+    # offline=True replays HTML from the fetch cache without network access;
+    # rebuild=True fills a new collection and switches the alias once it is done
+    workers = workers or DOCLING_WORKERS
+    cache = cache if cache is not None else FetchCache()
+    client = get_qdrant_client()
     domain = urlparse(seed_url).netloc
     count = 0
-    total_points = 0
-
-    while to_visit and count < limit:
-        url = to_visit.pop(0)
-        if url in visited:
-            continue
 
-        try:
-            if status_cb:
-                status_cb(f"Crawling {count + 1}/{limit}: {url}")
-            res = requests.get(url, timeout=8)
-            visited.add(url)
-            soup = BeautifulSoup(res.text, "html.parser")
-
-            for a in soup.find_all("a", href=True):
-                link = urljoin(seed_url, a["href"]).split("#")[0].rstrip("/")
-                if urlparse(link).netloc == domain and link not in visited:
-                    if not any(x in link for x in [".pdf", ".jpg", ".png", "/careers"]):
-                        to_visit.append(link)
-
-            page_title = (soup.title.string.strip() if soup.title and soup.title.string else "Tarento Page")
-            loader = DoclingLoader(file_path=url, export_type=ExportType.DOC_CHUNKS)
-            docs = loader.load()
-            total_points += upload_to_qdrant_clean(docs, source_url=url, title=page_title)
+    def handle_page(url, html, base_url):
+        soup = BeautifulSoup(html, "html.parser")
+        links = []
+        for a in soup.find_all("a", href=True):
+            link = urljoin(base_url, a["href"])
+            if urlparse(link).netloc == domain:
+                if not any(x in link for x in [".pdf", ".jpg", ".png", "/careers"]):
+                    links.append(link)
+
+        page_title = (soup.title.string.strip() if soup.title and soup.title.string else "Tarento Page")
+        return links, {"url": url, "html": html, "title": page_title, "text": soup.get_text(" ", strip=True)}
+
+    engine = CrawlEngine(
+        max_concurrency=FETCH_CONCURRENCY,
+        per_host_concurrency=FETCH_CONCURRENCY,
+        timeout=8,
+        cache=cache,
+        offline=offline,
+    )
+    pages = iter_crawl(seed_url, limit, handle_page, engine=engine)
+
+    def converted_chunks(pool):
+        nonlocal count
+        pending = {}
+
+        def drain(futures):
+            for future in futures:
+                page, digest = pending.pop(future)
+                try:
+                    texts = future.result()
+                except Exception as e:
+                    if status_cb:
+                        status_cb(f"Skipping {page['url']}: {e}")
+                    continue
+                for chunk_index, text in enumerate(texts):
+                    yield {
+                        "text": text,
+                        "source_url": page["url"],
+                        "title": page["title"],
+                        "content_hash": digest,
+                        "chunk_index": chunk_index,
+                        "chunk_count": len(texts),
+                        "ingest_source": INGEST_SOURCE,
+                    }
+
+        for page in pages:
             count += 1
-        except Exception as e:
             if status_cb:
-                status_cb(f"Skipping {url}: {e}")
-
+                status_cb(f"Crawling {count}/{limit}: {page['url']}")
+            digest = index.check(page["url"], page["text"])
+            if not digest:
+                continue
+
+            pending[pool.submit(convert_page, page["html"], page["url"])] = (page, digest)
+            # Hand finished conversions to the embedder without waiting on the rest
+            yield from drain([f for f in pending if f.done()])
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from drain(done)
+
+        yield from drain(as_completed(list(pending)))
+
+    with ingest_target(client, COLLECTION_NAME, rebuild=rebuild, hybrid=HYBRID_SEARCH, source=INGEST_SOURCE) as target:
+        # Pages whose text is unchanged since the last run skip Docling and embedding
+        index = IncrementalIndex(client, target.collection_name, source=INGEST_SOURCE)
+
+        # Spawned workers: forking while the crawl thread runs is not safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            total_points = target.points = ingest_chunks(
+                client,
+                get_embed_model(),
+                target.collection_name,
+                converted_chunks(pool),
+                make_id=chunk_point_id,
+                sparse_model=get_sparse_model() if HYBRID_SEARCH else None,
+            )
+        with span("ingest.finish"):
+            # Pages that failed to fetch, or lay past the limit, are kept
+            removed = index.finish(complete=engine.complete, missing=engine.missing)
+
+    if total_points or removed:
+        # Tells the chat apps to drop cached search results
+        bump_collection_version(client, COLLECTION_NAME)
+    print(f"Crawled {count} pages with {engine.requests} HTTP requests.")
     return count, total_points
 
 
@@ -0,0 +1,60 @@
+"""Measures Chunker throughput and chunk sizes on synthetic markdown pages.
+
+Usage: python benchmarks/chunk_throughput.py --pages 200 --paragraphs 40
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from ingest.chunking import Chunker, load_token_counter
+
+WORDS = (
+    "digital transformation govtech platform citizen services data cloud "
+    "karmayogi anuvaad ivolve learning translation analytics engineering "
+    "delivery product design mobile integration security scale"
+).split()
+
+
+def synthetic_page(rng, paragraphs):
+    blocks = []
+    for i in range(paragraphs):
+        if i % 6 == 0:
+            blocks.append(f"## Section {i // 6}")
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+            for _ in range(rng.randint(1, 8))
+        ]
+        blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    pages = [synthetic_page(rng, args.paragraphs) for _ in range(args.pages)]
+    count_tokens = load_token_counter()
+    chunker = Chunker(count_tokens=count_tokens)
+
+    start = time.perf_counter()
+    chunks = [chunk for page in pages for chunk in chunker.split(page)]
+    elapsed = time.perf_counter() - start
+
+    sizes = [count_tokens(chunk) for chunk in chunks]
+    megabytes = sum(len(page) for page in pages) / 1e6
+    print(f"pages:               {args.pages}")
+    print(f"chunks:              {len(chunks)}")
+    print(f"throughput:          {args.pages / elapsed:8.1f} pages/sec ({megabytes / elapsed:.2f} MB/s)")
+    print(f"tokens per chunk:    min {min(sizes)} | p50 {statistics.median(sizes):.0f} | max {max(sizes)}")
+    print(f"budget:              {chunker.max_tokens} tokens, {chunker.overlap_tokens} overlap")
+
+
+if __name__ == "__main__":
+    main()
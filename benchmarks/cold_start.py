@@ -0,0 +1,108 @@
+"""Cold-start time of the chat apps and the modules they import.
+
+Each target runs in a fresh interpreter, so nothing is warm: "import" targets
+time `import <module>`, "app" targets run a Streamlit script once through
+streamlit.testing (no browser) until it has rendered. Both report which heavy
+libraries ended up loaded. --first-search also times the first embedding,
+which is what a user waits for on the first question.
+
+Usage: python benchmarks/cold_start.py --runs 3 --first-search
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("fastembed", "onnxruntime", "groq", "docling", "langchain_docling", "torch", "transformers")
+TARGETS = {
+    "import retrieval.search": ("import", "retrieval.search"),
+    "import agent.gemini": ("import", "agent.gemini"),
+    "import Docling.ingest_clean": ("import", "Docling.ingest_clean"),
+    "app src/main.py": ("app", "src/main.py"),
+    "app Docling/chatbot_ui_docling.py": ("app", "Docling/chatbot_ui_docling.py"),
+}
+
+PROBE = """
+import json, sys, time
+sys.path[:0] = [{root!r}, {src!r}]
+kind, target, first_search = {kind!r}, {target!r}, {first_search!r}
+start = time.perf_counter()
+if kind == "import":
+    __import__(target)
+else:
+    from streamlit.testing.v1 import AppTest
+    AppTest.from_file({root!r} + "/" + target, default_timeout=600).run()
+seconds = time.perf_counter() - start
+result = {{"seconds": seconds}}
+if first_search:
+    start = time.perf_counter()
+    try:
+        from resources import get_embed_model
+        model = get_embed_model()
+    except ImportError:
+        from fastembed import TextEmbedding
+        model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    list(model.embed(["What does Tarento do?"]))
+    result["first_search_seconds"] = time.perf_counter() - start
+result["heavy"] = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps(result))
+"""
+
+
+def probe(kind, target, first_search):
+    code = PROBE.format(
+        root=str(REPO_ROOT), src=str(REPO_ROOT / "src"), kind=kind, target=target,
+        first_search=first_search, heavy=HEAVY_MODULES,
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, timeout=900
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        return {"error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--first-search", action="store_true", help="also time the first query embedding")
+    parser.add_argument("--output", type=Path, help="write the rows as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.targets:
+        kind, target = TARGETS[name]
+        samples = [probe(kind, target, args.first_search) for _ in range(args.runs)]
+        errors = [s["error"] for s in samples if "error" in s]
+        if errors:
+            rows.append({"target": name, "error": errors[0]})
+            continue
+        row = {
+            "target": name,
+            "median_s": round(statistics.median(s["seconds"] for s in samples), 3),
+            "heavy_modules": samples[0]["heavy"],
+        }
+        if args.first_search:
+            row["first_search_s"] = round(statistics.median(s["first_search_seconds"] for s in samples), 3)
+        rows.append(row)
+
+    for row in rows:
+        if "error" in row:
+            print(f"{row['target']:<36} failed: {row['error']}")
+            continue
+        first = f"  first search {row['first_search_s']:.2f}s" if "first_search_s" in row else ""
+        print(f"{row['target']:<36} {row['median_s']:>7.2f}s{first}  loaded: {', '.join(row['heavy_modules']) or '-'}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compares per-chunk embedding with the batched embed_chunks stage.
+
+Usage: python benchmarks/embed_throughput.py --chunks 2000 --batch-size 64 --parallel 0
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from fastembed import TextEmbedding
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from ingest.embedding import embed_chunks
+
+WORDS = (
+    "digital transformation govtech platform citizen services data cloud "
+    "karmayogi anuvaad ivolve learning translation analytics engineering "
+    "delivery product design mobile integration security scale"
+).split()
+
+
+def synthetic_corpus(n_chunks, words_per_chunk=120, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"text": " ".join(rng.choice(WORDS) for _ in range(words_per_chunk))}
+        for _ in range(n_chunks)
+    ]
+
+
+def run_per_chunk(embed_model, corpus):
+    # The old ingest loop: one embed() call and one list conversion per chunk
+    start = time.perf_counter()
+    for chunk in corpus:
+        list(embed_model.embed([chunk["text"]]))[0].tolist()
+    return time.perf_counter() - start
+
+
+def run_batched(embed_model, corpus, batch_size, parallel):
+    start = time.perf_counter()
+    for _ in embed_chunks(embed_model, iter(corpus), batch_size=batch_size, parallel=parallel):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--parallel", type=int, default=None)
+    args = parser.parse_args()
+
+    embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    corpus = synthetic_corpus(args.chunks)
+    # Warm up ONNX session so neither run pays the first-call cost
+    list(embed_model.embed(["warm up"]))
+
+    before = run_per_chunk(embed_model, corpus)
+    after = run_batched(embed_model, corpus, args.batch_size, args.parallel)
+
+    print(f"chunks:              {args.chunks}")
+    print(f"per-chunk embed:     {args.chunks / before:8.1f} chunks/sec ({before:.2f}s)")
+    print(f"batched embed:       {args.chunks / after:8.1f} chunks/sec ({after:.2f}s)")
+    print(f"speedup:             {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
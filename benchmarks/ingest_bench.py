@@ -0,0 +1,238 @@
+"""Offline ingest benchmark: synthetic local site + in-memory Qdrant.
+
+Times run_local_recursive_crawl (src/ingest/scraper.py), crawl_tarento
+(Docling/ingest_clean.py) and the bare chunk -> embed -> upsert stages, each
+in a fresh process so peak memory is per stage. Results are written as JSON;
+if the output file already exists the new run is compared against it.
+
+Usage: python benchmarks/ingest_bench.py --pages 100 --graph random --output benchmarks/results/ingest.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT / "src"))
+from site_fixture import GRAPHS, SiteServer, build_site
+
+STAGES = ("scraper", "docling", "chunk_embed")
+COMPARED = ("pages_per_sec", "chunks_per_sec", "embed_seconds", "upsert_seconds", "peak_rss_mb")
+
+
+class TimedEmbedding:
+    """Wraps a TextEmbedding and adds up time spent inside embed().
+
+    Ingest feeds embed() a lazy stream, so time spent producing the input
+    (crawling, chunking) is subtracted out.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.seconds = 0.0
+        self._upstream = 0.0
+
+    def _timed_input(self, documents):
+        iterator = iter(documents)
+        while True:
+            start = time.perf_counter()
+            try:
+                document = next(iterator)
+            except StopIteration:
+                self._upstream += time.perf_counter() - start
+                return
+            self._upstream += time.perf_counter() - start
+            yield document
+
+    def embed(self, documents, **kwargs):
+        vectors = iter(self.model.embed(self._timed_input(documents), **kwargs))
+        while True:
+            start, upstream = time.perf_counter(), self._upstream
+            try:
+                vector = next(vectors)
+            except StopIteration:
+                return
+            finally:
+                self.seconds += time.perf_counter() - start - (self._upstream - upstream)
+            yield vector
+
+
+class TimedClient:
+    """Proxies a QdrantClient, adding up time spent in upload_collection."""
+
+    def __init__(self, client):
+        self.client = client
+        self.seconds = 0.0
+
+    def upload_collection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.client.upload_collection(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stage_scraper(base_url, pages, workers):
+    # scraper.py refuses to import without a Qdrant URL; the client is swapped below
+    os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+    os.environ.pop("OFFLINE_REPLAY", None)
+    sys.path.append(str(REPO_ROOT))
+    from qdrant_client import QdrantClient
+    from src.ingest import scraper
+
+    client, embed_model = TimedClient(QdrantClient(":memory:")), TimedEmbedding(scraper.get_embed_model())
+    scraper.get_qdrant_client = lambda *args, **kwargs: client
+    scraper.get_embed_model = lambda: embed_model
+    scraper.BASE_URL, scraper.MAX_PAGES, scraper.USE_FETCH_CACHE = base_url, pages, False
+
+    start = time.perf_counter()
+    chunks = scraper.run_local_recursive_crawl(incremental=False)
+    elapsed = time.perf_counter() - start
+    return elapsed, chunks, embed_model.seconds, client.seconds
+
+
+def stage_docling(base_url, pages, workers):
+    sys.path.append(str(REPO_ROOT / "Docling"))
+    import ingest_clean
+    from ingest.fetch_cache import FetchCache
+    from qdrant_client import QdrantClient
+
+    client, embed_model = TimedClient(QdrantClient(":memory:")), TimedEmbedding(ingest_clean.get_embed_model())
+    ingest_clean.get_qdrant_client = lambda: client
+    ingest_clean.get_embed_model = lambda: embed_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A throwaway cache so the benchmark neither reads nor pollutes .cache/
+        cache = FetchCache(Path(tmp) / "fetch_cache.sqlite3")
+        start = time.perf_counter()
+        _, chunks = ingest_clean.crawl_tarento(base_url, limit=pages, workers=workers, cache=cache)
+        elapsed = time.perf_counter() - start
+        cache.close()
+    return elapsed, chunks, embed_model.seconds, client.seconds
+
+
+def stage_chunk_embed(base_url, pages, workers):
+    import httpx
+    from bs4 import BeautifulSoup
+    from fastembed import TextEmbedding
+    from ingest.chunking import Chunker
+    from ingest.pipeline import ensure_collection, ingest_chunks
+    from qdrant_client import QdrantClient
+
+    # Fetched up front so only chunking, embedding and upserting are timed
+    texts = []
+    with httpx.Client(base_url=base_url) as http:
+        for path in ["/"] + [f"/page-{i}" for i in range(1, pages)]:
+            soup = BeautifulSoup(http.get(path).text, "html.parser")
+            texts.append(soup.find("main").get_text(" ", strip=True))
+
+    chunker = Chunker()
+    client = TimedClient(QdrantClient(":memory:"))
+    embed_model = TimedEmbedding(TextEmbedding(model_name="BAAI/bge-small-en-v1.5"))
+    ensure_collection(client, "bench")
+
+    start = time.perf_counter()
+    chunks = [
+        {"text": chunk, "source_url": f"{base_url}/page-{i}", "chunk_index": n}
+        for i, text in enumerate(texts)
+        for n, chunk in enumerate(chunker.split(text))
+    ]
+    total = ingest_chunks(client, embed_model, "bench", iter(chunks))
+    elapsed = time.perf_counter() - start
+    return elapsed, total, embed_model.seconds, client.seconds
+
+
+def measure_stage(name, base_url, pages, workers):
+    return globals()[f"stage_{name}"](base_url, pages, workers) + (peak_rss_mb(),)
+
+
+def run_stage(name, server, pages, workers):
+    fetched_before = server.requests
+    # A fresh process per stage keeps peak RSS (and imported models) separate
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        future = pool.submit(measure_stage, name, server.base_url, pages, workers)
+        elapsed, chunks, embed_seconds, upsert_seconds, peak = future.result()
+    fetched = server.requests - fetched_before
+
+    return {
+        "seconds": round(elapsed, 3),
+        "pages": fetched,
+        "chunks": chunks,
+        "pages_per_sec": round(fetched / elapsed, 2),
+        "chunks_per_sec": round(chunks / elapsed, 2),
+        "embed_seconds": round(embed_seconds, 3),
+        "upsert_seconds": round(upsert_seconds, 3),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+def compare(previous, current):
+    for name, result in current["stages"].items():
+        before = previous.get("stages", {}).get(name)
+        if not before or "skipped" in result or "skipped" in before:
+            continue
+        changes = []
+        for metric in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {100 * (new - old) / old:+.1f}%")
+        print(f"{name:12} vs previous: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--graph", choices=GRAPHS, default="random")
+    parser.add_argument("--out-degree", type=int, default=5)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--words", type=int, default=80, help="words per paragraph")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Docling process pool size")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", type=Path, default=REPO_ROOT / "benchmarks" / "results" / "ingest.json")
+    args = parser.parse_args()
+
+    site = build_site(args.pages, args.graph, args.out_degree, args.paragraphs, args.words)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "stages")},
+        "stages": {},
+    }
+
+    with SiteServer(site) as server:
+        for name in args.stages:
+            print(f"⏱️ {name} ...")
+            try:
+                result = run_stage(name, server, args.pages, args.workers)
+            except ImportError as e:
+                # Docling is an optional, heavy dependency
+                result = {"skipped": str(e)}
+            report["stages"][name] = result
+            print(f"   {json.dumps(result)}")
+
+    if args.output.exists():
+        compare(json.loads(args.output.read_text(encoding="utf-8")), report)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Load test of the Groq client layer against a local mock server.
+
+Starts a mock of Groq's chat completions endpoint on localhost that answers
+after --latency-ms (the fallback model 4x faster) and fails --error-rate of
+the requests with 429 (Retry-After: 1) or 503. --sessions threads, like
+concurrent Streamlit sessions, send --requests questions in total through
+agent.llm.LLMClient. The report covers p50/p95 latency, outcomes, retries,
+fallbacks and the most requests the server saw at once (bounded by
+--concurrency, plus any the client already gave up on). --sync runs the
+same load through one plain groq.Groq client, which is what agent.gemini
+used before.
+
+Usage: python benchmarks/llm_load.py --sessions 16 --requests 64 --error-rate 0.2 --concurrency 8 --stream --sync
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from agent.llm import LLMClient, LLMDeadlineExceeded, LLMUnavailable
+
+PRIMARY_MODEL = "mock-large"
+FALLBACK_MODEL = "mock-small"
+ANSWER = "Tarento builds digital public infrastructure such as Mission Karmayogi and Anuvaad."
+MESSAGES = [{"role": "user", "content": "What does Tarento build?"}]
+
+
+class MockGroq(BaseHTTPRequestHandler):
+    """OpenAI-compatible /openai/v1/chat/completions with injected latency and errors."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse shows up
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            roll = server.random.random()
+        try:
+            if roll < server.error_rate / 2:
+                return self._send(429, {"error": {"message": "Rate limit reached"}}, {"retry-after": "1"})
+            if roll < server.error_rate:
+                return self._send(503, {"error": {"message": "Service unavailable"}})
+            speedup = 4 if body["model"] == FALLBACK_MODEL else 1
+            time.sleep(server.latency / speedup)
+            if body.get("stream"):
+                return self._stream(body["model"])
+            self._send(200, {
+                "id": "mock", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up on its deadline
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in ANSWER.split(" "):
+            chunk = {
+                "id": "mock", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(0.005)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock(latency_ms, error_rate, seed):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockGroq)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.latency = latency_ms / 1000
+    server.error_rate = error_rate
+    server.random = random.Random(seed)
+    server.active = server.peak = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_load(ask, sessions, requests):
+    def one(_):
+        start = time.perf_counter()
+        try:
+            ask()
+            outcome = "ok"
+        except LLMDeadlineExceeded:
+            outcome = "deadline"
+        except LLMUnavailable:
+            outcome = "unavailable"
+        except Exception as e:
+            outcome = type(e).__name__
+        return time.perf_counter() - start, outcome
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(one, range(requests)))
+    return results, time.perf_counter() - start
+
+
+def report(label, results, wall, server, stats=None):
+    latencies = sorted(seconds for seconds, _ in results)
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    p95 = statistics.quantiles(latencies, n=100, method="inclusive")[94] if len(latencies) > 1 else latencies[0]
+    line = (
+        f"{label:8} p50 {statistics.median(latencies) * 1000:7.0f} ms | p95 {p95 * 1000:7.0f} ms | "
+        f"wall {wall:6.2f}s | peak in flight {server.peak:3} | "
+        + ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items()))
+    )
+    if stats:
+        line += f" | retries {stats['retries']}, fallbacks {stats['fallbacks']}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--stream", action="store_true", help="stream the answers")
+    parser.add_argument("--sync", action="store_true", help="also run one plain groq.Groq client")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server, base_url = start_mock(args.latency_ms, args.error_rate, args.seed)
+    print(
+        f"Mock Groq at {base_url}: {args.latency_ms:.0f} ms, {args.error_rate:.0%} errors, "
+        f"{args.sessions} sessions, {args.requests} requests"
+    )
+
+    client = LLMClient(
+        api_key="mock", base_url=base_url, model=PRIMARY_MODEL, fallback_model=FALLBACK_MODEL,
+        deadline=args.deadline, concurrency=args.concurrency,
+    )
+    if args.stream:
+        ask = lambda: "".join(client.stream_sync(MESSAGES))
+    else:
+        ask = lambda: client.complete_sync(MESSAGES)
+    results, wall = run_load(ask, args.sessions, args.requests)
+    report("async", results, wall, server, client.stats)
+
+    if args.sync:
+        from groq import Groq
+
+        server.active = server.peak = 0
+        plain = Groq(api_key="mock", base_url=base_url)
+        if args.stream:
+            ask = lambda: [c for c in plain.chat.completions.create(messages=MESSAGES, model=PRIMARY_MODEL, stream=True)]
+        else:
+            ask = lambda: plain.chat.completions.create(messages=MESSAGES, model=PRIMARY_MODEL)
+        results, wall = run_load(ask, args.sessions, args.requests)
+        report("sync", results, wall, server)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Retrieval latency and quality benchmark over a labeled fixture corpus.
+
+Loads benchmarks/fixtures/retrieval_corpus.json into a local Qdrant, runs
+every labeled query through search_collection + apply_score_threshold (what
+search_knowledge_base does in both apps) and sweeps limit x threshold.
+Reports p50/p95/p99 latency, recall@k, MRR, hits passed to the LLM and how
+often an off-topic query still gets context. --hybrid also indexes BM25
+sparse vectors and compares dense-only against hybrid (RRF) search.
+--multi-query adds multi_query_search (batched query variants, optionally
+reranked with --rerank) and prints its mean time per stage.
+
+Usage: python benchmarks/retrieval_bench.py --limits 3 5 8 --thresholds 0.30 0.45 0.60 --gate top --hybrid --multi-query --rerank
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fastembed import TextEmbedding
+from qdrant_client import QdrantClient
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT / "src"))
+from ingest.chunking import Chunker
+from ingest.incremental import chunk_point_id
+from ingest.pipeline import ensure_collection, ingest_chunks
+from resources import get_sparse_model
+from retrieval.multi_query import Reranker, multi_query_search
+from retrieval.search import apply_score_threshold, search_collection
+
+FIXTURE = REPO_ROOT / "benchmarks" / "fixtures" / "retrieval_corpus.json"
+COLLECTION_NAME = "retrieval_bench"
+
+
+def load_fixture(path=FIXTURE):
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return data["pages"], data["queries"]
+
+
+def build_index(client, embed_model, collection_name, pages, sparse_model=None):
+    """Chunks and ingests the fixture pages the same way the crawlers do."""
+    chunker = Chunker()
+    chunks = (
+        {"text": text, "source_url": page["url"], "title": page["title"], "chunk_index": i}
+        for page in pages
+        for i, text in enumerate(chunker.split(page["text"]))
+    )
+    ensure_collection(client, collection_name, hybrid=sparse_model is not None)
+    return ingest_chunks(
+        client, embed_model, collection_name, chunks, make_id=chunk_point_id, wait=True, sparse_model=sparse_model
+    )
+
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1] if len(samples) > 1 else samples[0]
+
+
+def run_queries(search, queries, limit, repeats):
+    """Returns ({query: hits}, latencies in ms) for one limit setting."""
+    results, latencies = {}, []
+    for _ in range(repeats):
+        for item in queries:
+            start = time.perf_counter()
+            results[item["query"]] = search(item["query"], limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def score(results, queries, threshold, gate):
+    recalls, reciprocal_ranks, passed, leaked = [], [], [], []
+    for item in queries:
+        hits = apply_score_threshold(results[item["query"]], threshold, gate=gate)
+        passed.append(len(hits))
+        relevant = set(item["relevant"])
+        if not relevant:
+            # Off-topic query: any context that survives the threshold is noise
+            leaked.append(bool(hits))
+            continue
+
+        ranked = list(dict.fromkeys(hit["url"] for hit in hits))
+        recalls.append(len(relevant.intersection(ranked)) / len(relevant))
+        rank = next((i for i, url in enumerate(ranked, 1) if url in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "recall": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "avg_hits": statistics.mean(passed),
+        "offtopic_context_rate": statistics.mean(leaked) if leaked else None,
+    }
+
+
+def sweep(search, queries, limits, thresholds, gate, repeats, mode="dense"):
+    rows = []
+    for limit in limits:
+        results, latencies = run_queries(search, queries, limit, repeats)
+        latency = {f"p{p}_ms": round(percentile(latencies, p), 2) for p in (50, 95, 99)}
+        for threshold in thresholds:
+            quality = score(results, queries, threshold, gate)
+            rows.append({"mode": mode, "limit": limit, "threshold": threshold, "gate": gate, **latency, **quality})
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'mode':>14} {'limit':>5} {'thresh':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'recall@k':>8} {'MRR':>6} {'hits':>5} {'offtopic':>8}")
+    for row in rows:
+        offtopic = "-" if row["offtopic_context_rate"] is None else f"{row['offtopic_context_rate']:.0%}"
+        print(
+            f"{row['mode']:>14} {row['limit']:>5} {row['threshold']:>6.2f} {row['p50_ms']:>7.1f} {row['p95_ms']:>7.1f} "
+            f"{row['p99_ms']:>7.1f} {row['recall']:>8.2f} {row['mrr']:>6.2f} {row['avg_hits']:>5.1f} {offtopic:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture", type=Path, default=FIXTURE)
+    parser.add_argument("--limits", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.30, 0.45, 0.60])
+    parser.add_argument("--gate", choices=["top", "each"], default="top",
+                        help="top: src/main.py behaviour, each: Docling UI behaviour")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--hybrid", action="store_true", help="also run dense + BM25 hybrid search")
+    parser.add_argument("--multi-query", action="store_true", help="also run multi_query_search")
+    parser.add_argument("--rerank", action="store_true", help="rerank multi-query results with a cross-encoder")
+    parser.add_argument("--budget-ms", type=float, default=600, help="multi-query latency budget")
+    parser.add_argument("--qdrant-path", help="on-disk local Qdrant instead of :memory:")
+    parser.add_argument("--output", type=Path, help="write the rows as JSON")
+    args = parser.parse_args()
+
+    pages, queries = load_fixture(args.fixture)
+    client = QdrantClient(path=args.qdrant_path) if args.qdrant_path else QdrantClient(":memory:")
+    embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    sparse_model = get_sparse_model() if args.hybrid else None
+    points = build_index(client, embed_model, COLLECTION_NAME, pages, sparse_model)
+    print(f"Indexed {len(pages)} pages as {points} chunks; {len(queries)} labeled queries.")
+
+    modes = {"dense": None, "hybrid": sparse_model} if args.hybrid else {"dense": None}
+    rows = []
+    for mode, mode_sparse in modes.items():
+        def search(query, limit):
+            return search_collection(
+                client, embed_model, COLLECTION_NAME, query, limit,
+                sparse_model=mode_sparse, named_vectors=args.hybrid,
+            )
+
+        search(queries[0]["query"], max(args.limits))  # warm up the ONNX sessions
+        rows += sweep(search, queries, args.limits, args.thresholds, args.gate, args.repeats, mode)
+
+    if args.multi_query:
+        reranker = Reranker() if args.rerank else None
+        stage_ms = {}
+        for mode, mode_sparse in modes.items():
+            mode = f"{mode}-multi" + ("+rr" if reranker else "")
+
+            def search(query, limit):
+                hits, _, timings = multi_query_search(
+                    client, embed_model, COLLECTION_NAME, query, limit, reranker=reranker,
+                    sparse_model=mode_sparse, named_vectors=args.hybrid, budget_ms=args.budget_ms,
+                )
+                for stage, ms in timings.items():
+                    stage_ms.setdefault(mode, {}).setdefault(stage, []).append(ms)
+                return hits
+
+            search(queries[0]["query"], max(args.limits))
+            stage_ms.pop(mode)
+            rows += sweep(search, queries, args.limits, args.thresholds, args.gate, args.repeats, mode)
+        for mode, stages in stage_ms.items():
+            print(mode + ": " + ", ".join(f"{stage} {statistics.mean(ms):.1f}" for stage, ms in stages.items()))
+    print_rows(rows)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Synthetic website served from a local HTTP server, for offline benchmarks.
+
+Usage: python benchmarks/site_fixture.py --pages 200 --graph random   (serves until Ctrl+C)
+"""
+import argparse
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "digital transformation govtech platform citizen services data cloud "
+    "karmayogi anuvaad ivolve learning translation analytics engineering "
+    "delivery product design mobile integration security scale"
+).split()
+GRAPHS = ("random", "tree", "chain")
+
+
+def page_path(index):
+    return "/" if index == 0 else f"/page-{index}"
+
+
+def link_graph(pages, graph="random", out_degree=5, seed=7):
+    """Returns {page index: [linked page indexes]}; every page is reachable from page 0."""
+    rng = random.Random(seed)
+    edges = {}
+    for i in range(pages):
+        if graph == "tree":
+            targets = [c for c in (2 * i + 1, 2 * i + 2) if c < pages]
+        elif graph == "chain":
+            targets = [i + 1] if i + 1 < pages else []
+        else:
+            # The i -> i+1 edge keeps everything reachable; the rest is noise
+            targets = [i + 1] if i + 1 < pages else []
+            targets += [rng.randrange(pages) for _ in range(max(out_degree - 1, 0))]
+        edges[i] = targets + [0]
+    return edges
+
+
+def render_page(index, targets, rng, paragraphs=12, words_per_paragraph=80):
+    sections = []
+    for p in range(paragraphs):
+        if p % 4 == 0:
+            sections.append(f"<h2>Section {p // 4} of page {index}</h2>")
+        words = " ".join(rng.choice(WORDS) for _ in range(words_per_paragraph))
+        sections.append(f"<p>{words.capitalize()}.</p>")
+    links = "".join(f'<a href="{page_path(t)}">Page {t}</a> ' for t in targets)
+    return (
+        f"<html><head><title>Synthetic page {index}</title></head><body>"
+        f"<header><nav>{links}</nav></header>"
+        f"<main><h1>Synthetic page {index}</h1>{''.join(sections)}</main>"
+        f"<footer>SAY HELLO</footer></body></html>"
+    )
+
+
+def build_site(pages=100, graph="random", out_degree=5, paragraphs=12, words_per_paragraph=80, seed=7):
+    """Returns {path: html} for a synthetic site of `pages` pages."""
+    rng = random.Random(seed)
+    edges = link_graph(pages, graph, out_degree, seed)
+    return {
+        page_path(i): render_page(i, edges[i], rng, paragraphs, words_per_paragraph)
+        for i in range(pages)
+    }
+
+
+class SiteServer:
+    """Serves a {path: html} site on 127.0.0.1 from a background thread.
+
+    requests counts every GET, so callers can measure pages fetched per run.
+    """
+
+    def __init__(self, site, port=0):
+        self.site = site
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                body = server.site.get(self.path.rstrip("/") or "/")
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--graph", choices=GRAPHS, default="random")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with SiteServer(build_site(args.pages, args.graph), port=args.port) as server:
+        print(f"Serving {args.pages} pages at {server.base_url}/ (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Memory / latency / recall tradeoffs of quantized and on-disk collections.
+
+Builds one collection per storage preset (float32, scalar int8, binary, each
+optionally with on-disk originals) from the same synthetic corpus, then
+sweeps hnsw_ef at query time. Recall@k is measured against exact float32
+search; RAM is estimated from point count, dimension and storage layout.
+
+Quantization, on-disk storage and HNSW only exist in a Qdrant server; the
+local in-process mode accepts the settings but searches brute force, so run
+against one, e.g. docker run -p 6333:6333 qdrant/qdrant.
+
+Usage: python benchmarks/storage_bench.py --qdrant-url http://localhost:6333 --points 20000 --hnsw-ef 32 64 128
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from fastembed import TextEmbedding
+from qdrant_client import QdrantClient, models
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT / "src"))
+from ingest.pipeline import ensure_collection
+from retrieval.search import make_search_params
+from retrieval_bench import load_fixture, percentile
+
+PRESETS = {
+    "float32": {},
+    "float32-disk": {"on_disk": True},
+    "scalar": {"quantization": "scalar"},
+    "scalar-disk": {"quantization": "scalar", "on_disk": True},
+    "binary": {"quantization": "binary"},
+    "binary-disk": {"quantization": "binary", "on_disk": True},
+}
+QUANTIZED_BYTES_PER_DIM = {None: 0, "scalar": 1, "binary": 1 / 8}
+
+
+def synthetic_corpus(points, queries, seed=7):
+    """Recombines fixture sentences into `points` texts; queries mix labeled questions and sentences."""
+    pages, labeled = load_fixture()
+    sentences = [s for page in pages for s in re.split(r"(?<=[.!?])\s+", page["text"]) if s]
+    rng = random.Random(seed)
+    texts = [" ".join(rng.sample(sentences, 3)) for _ in range(points)]
+    questions = [item["query"] for item in labeled]
+    questions += [rng.choice(sentences) for _ in range(max(queries - len(questions), 0))]
+    return texts, questions[:queries]
+
+
+def estimate_ram_mb(points, dim, quantization=None, on_disk=False, hnsw_m=None):
+    original = 0 if on_disk else points * dim * 4
+    quantized = points * dim * QUANTIZED_BYTES_PER_DIM[quantization]
+    # Level-0 HNSW links: up to 2*m neighbours of 4 bytes each
+    graph = points * 2 * (hnsw_m or 16) * 4
+    return round((original + quantized + graph) / 2**20, 1)
+
+
+def wait_until_indexed(client, collection_name, timeout=600):
+    deadline = time.monotonic() + timeout
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{collection_name} is still optimizing after {timeout}s")
+        time.sleep(1)
+
+
+def search_ids(client, collection_name, query_vectors, limit, params):
+    ids, latencies = [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        points = client.query_points(
+            collection_name=collection_name, query=vector, limit=limit, search_params=params
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([point.id for point in points])
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--qdrant-url", help="Qdrant server (default: in-process, which ignores quantization)")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--presets", nargs="+", choices=PRESETS, default=list(PRESETS))
+    parser.add_argument("--hnsw-m", type=int)
+    parser.add_argument("--ef-construct", type=int)
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[0, 64, 128], help="0 = Qdrant default")
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--output", type=Path, help="write the rows as JSON")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(":memory:")
+    embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    texts, questions = synthetic_corpus(args.points, args.queries)
+    print(f"Embedding {len(texts)} texts and {len(questions)} queries...")
+    vectors = np.vstack(list(embed_model.embed(texts, batch_size=256)))
+    query_vectors = [vector.tolist() for vector in embed_model.embed(questions)]
+
+    # Ground truth: exact cosine top-k over the float32 vectors (bge output is normalized)
+    scores = np.asarray(query_vectors) @ vectors.T
+    truth = [list(row) for row in np.argsort(-scores, axis=1)[:, :args.limit]]
+
+    rows = []
+    for preset in args.presets:
+        options = PRESETS[preset]
+        name = f"storage_bench_{preset.replace('-', '_')}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        ensure_collection(
+            client, name, vector_size=vectors.shape[1],
+            quantization=options.get("quantization"), on_disk=options.get("on_disk", False),
+            hnsw_m=args.hnsw_m, hnsw_ef_construct=args.ef_construct,
+        )
+        # Same integer IDs in every preset so results compare against one ground truth
+        client.upload_collection(
+            collection_name=name, vectors=vectors, ids=range(len(texts)), batch_size=256, wait=True
+        )
+        wait_until_indexed(client, name)
+
+        for hnsw_ef in args.hnsw_ef:
+            params = make_search_params(
+                hnsw_ef=hnsw_ef or None, oversampling=args.oversampling, rescore=not args.no_rescore
+            )
+            search_ids(client, name, query_vectors[:10], args.limit, params)  # warm up
+            ids, latencies = search_ids(client, name, query_vectors, args.limit, params)
+            recall = statistics.mean(len(set(got) & set(map(int, want))) / len(want) for got, want in zip(ids, truth))
+            rows.append({
+                "preset": preset,
+                "hnsw_ef": hnsw_ef or None,
+                "est_ram_mb": estimate_ram_mb(
+                    len(texts), vectors.shape[1], options.get("quantization"), options.get("on_disk", False), args.hnsw_m
+                ),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                f"recall@{args.limit}": round(recall, 4),
+            })
+        client.delete_collection(name)
+
+    print(f"{'preset':>13} {'hnsw_ef':>7} {'RAM MB':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'recall':>7}")
+    for row in rows:
+        print(
+            f"{row['preset']:>13} {row['hnsw_ef'] or 'default':>7} {row['est_ram_mb']:>8.1f} {row['p50_ms']:>7.2f} "
+            f"{row['p95_ms']:>7.2f} {row['p99_ms']:>7.2f} {row[f'recall@{args.limit}']:>7.3f}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
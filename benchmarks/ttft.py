@@ -0,0 +1,69 @@
+"""Measures time-to-first-token for blocking vs streaming Groq answers.
+
+Usage: python benchmarks/ttft.py --runs 5   (needs GROQ_API_KEY)
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from agent.gemini import get_assistant_response, stream_assistant_response
+
+CONTEXT = (
+    "Data: Tarento is a technology services company that builds digital public "
+    "infrastructure such as Mission Karmayogi (iGOT) and the Anuvaad translation "
+    "platform. | Link: https://www.tarento.com/case-studies"
+)
+QUESTIONS = [
+    "What is Mission Karmayogi?",
+    "What does Anuvaad do?",
+    "Which GovTech platforms has Tarento built?",
+]
+
+
+def time_blocking(question):
+    # The UI can show nothing until the whole completion is back
+    start = time.perf_counter()
+    get_assistant_response(question, CONTEXT, [])
+    total = time.perf_counter() - start
+    return total, total
+
+
+def time_streaming(question):
+    start = time.perf_counter()
+    first = None
+    for _ in stream_assistant_response(question, CONTEXT, []):
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return (first if first is not None else total), total
+
+
+def summarize(label, samples):
+    ttft = [s[0] for s in samples]
+    total = [s[1] for s in samples]
+    print(
+        f"{label:10} TTFT p50 {statistics.median(ttft) * 1000:7.0f} ms | "
+        f"total p50 {statistics.median(total) * 1000:7.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    blocking, streaming = [], []
+    for _ in range(args.runs):
+        for question in QUESTIONS:
+            blocking.append(time_blocking(question))
+            streaming.append(time_streaming(question))
+
+    summarize("blocking", blocking)
+    summarize("streaming", streaming)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,128 @@
-import os
-import time
-from firecrawl import Firecrawl
-from qdrant_client import QdrantClient, models
-from fastembed import TextEmbedding
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Shared ingest helpers live under src/ingest
+sys.path.append(str(Path(__file__).resolve().parent / "src"))
+from ingest.aliases import ingest_target
+from ingest.chunking import Chunker
+from ingest.embedding import HYBRID_SEARCH
+from ingest.firecrawl_jobs import CrawlFailed, CrawlJobManager, CrawlTimeout
+from ingest.incremental import GONE_STATUSES, IncrementalIndex, chunk_point_id
+from ingest.pipeline import ingest_chunks
+from resources import get_embed_model, get_firecrawl_client, get_qdrant_client, get_sparse_model
+from retrieval.versioning import bump_collection_version
+from tracing import span, traced
+
 load_dotenv()
 
-# 1. Initialize Clients (Note: Using 'Firecrawl' class for v2)
-app = Firecrawl(api_key=os.getenv("FIRECRAWL_API_KEY"))
-client_db = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
-embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+# 1. Clients come from the shared registry (Firecrawl v2 SDK); pass firecrawl= to inject one
 COLLECTION_NAME = "tarento_web_data"
+# Docling/ingest_clean.py and src/ingest/ingest_data.py write here too
+INGEST_SOURCE = "firecrawl"
+# We use limit=20 to stay within free tier limits/testing time
+CRAWL_LIMIT = 20
 
-def run_deep_ingestion(start_url="https://www.tarento.com"):
-    print(f"🕵️ Starting async crawl on {start_url}...")
-    
-    # 2. Start the job without waiting
-    # We use limit=20 to stay within free tier limits/testing time
-    crawl_job = app.start_crawl(
-        url=start_url,
-        params={
-            "limit": 20,
-            "scrapeOptions": {"formats": ["markdown"]}
-        }
-    )
-    job_id = crawl_job['id']
-    print(f"✅ Job initiated! ID: {job_id}")
-
-    # 3. Polling Loop: Wait for completion with feedback
-    crawl_result = None
-    while True:
-        status_data = app.get_crawl_status(job_id)
-        status = status_data.get('status')
-        completed = status_data.get('completed', 0)
-        total = status_data.get('total', 0)
+@traced("ingest", source="firecrawl")
+def run_deep_ingestion(start_url="https://www.tarento.com", rebuild=False, job_id=None, firecrawl=None):
+    """Crawls start_url with Firecrawl and ingests pages while the crawl runs.
 
-        print(f"⏳ Status: {status} | Progress: {completed}/{total} pages")
+    job_id resumes an existing crawl job; by default an unfinished job from
+    an earlier run of the same start_url and CRAWL_LIMIT is picked up again
+    while Firecrawl still has it.
+    """
+    client_db = get_qdrant_client()
+    embed_model = get_embed_model()
+    sparse_model = get_sparse_model() if HYBRID_SEARCH else None
+    chunker = Chunker()
 
-        if status == 'completed':
-            crawl_result = status_data.get('data', [])
-            break
-        elif status == 'failed':
-            print(f"❌ Crawl failed: {status_data.get('error')}")
-            return
-        
-        time.sleep(5) # Check every 5 seconds
+    # 2. Start the job without waiting (or resume one an earlier run left behind)
+    jobs = CrawlJobManager(firecrawl or get_firecrawl_client(), source=INGEST_SOURCE)
+    resumed = bool(job_id)
+    if not job_id:
+        job_id, resumed = jobs.resume_or_start(start_url, limit=CRAWL_LIMIT)
+    if resumed:
+        print(f"🔁 Resuming crawl job {job_id} on {start_url}...")
+    else:
+        print(f"🕵️ Started async crawl on {start_url}. ✅ Job initiated! ID: {job_id}")
 
-    # 4. Processing Phase
-    points = []
-    point_id = 0
+    # 3. Processing Phase: pages are chunked and embedded as the status polls
+    # return them, while Firecrawl keeps crawling (unchanged pages are skipped).
+    # rebuild=True fills a new collection and switches the alias once it is done.
+    try:
+        with ingest_target(
+            client_db, COLLECTION_NAME, rebuild=rebuild, hybrid=HYBRID_SEARCH, source=INGEST_SOURCE
+        ) as target:
+            index = IncrementalIndex(client_db, target.collection_name, source=INGEST_SOURCE)
+            crawled, missing, failed = 0, set(), set()
 
-    for page in crawl_result:
-        markdown_text = page.get('markdown', '')
-        metadata = page.get('metadata', {})
-        # This is where the deep citation link comes from!
-        actual_url = metadata.get('sourceURL') or metadata.get('url') or start_url
-        title = metadata.get('title') or "Tarento Page"
+            def iter_chunks():
+                nonlocal crawled
+                for page in jobs.pages(job_id):
+                    crawled += 1
+                    markdown_text = page['markdown']
+                    # This is where the deep citation link comes from!
+                    actual_url = page['url'] or start_url
+                    if page['status_code'] and page['status_code'] >= 400:
+                        # Error pages are not content; only 404 / 410 mean the page is gone
+                        (missing if page['status_code'] in GONE_STATUSES else failed).add(actual_url)
+                        print(f"⚠️ Skipping {actual_url}: HTTP {page['status_code']}")
+                        continue
+                    title = page['title'] or "Tarento Page"
 
-        print(f"📄 Processing: {actual_url}")
+                    digest = index.check(actual_url, markdown_text)
+                    if not digest:
+                        print(f"⏭️ Unchanged: {actual_url}")
+                        continue
 
-        # Chunking for BGE (Max 512 tokens, ~1000 chars is safe)
-        chunks = [markdown_text[i:i+1000] for i in range(0, len(markdown_text), 1000)]
+                    print(f"📄 Processing: {actual_url}")
 
-        for chunk in chunks:
-            # Generate the 384-dimensional vector
-            vector = list(embed_model.embed([chunk]))[0].tolist()
+                    # Chunking for BGE: headings/paragraphs packed under its 512-token limit
+                    with span("ingest.chunk"):
+                        chunks = chunker.split(markdown_text)
+                    for chunk_index, chunk in enumerate(chunks):
+                        yield {
+                            "text": chunk,
+                            "source_url": actual_url,
+                            "title": title,
+                            "content_hash": digest,
+                            "chunk_index": chunk_index,
+                            "chunk_count": len(chunks),
+                            "ingest_source": INGEST_SOURCE,
+                        }
 
-            points.append(
-                models.PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload={
-                        "text": chunk,
-                        "source_url": actual_url,
-                        "title": title
-                    }
-                )
+            # Generate the 384-dimensional vectors and push to Qdrant Cloud in batches
+            total = target.points = ingest_chunks(
+                client_db,
+                embed_model,
+                target.collection_name,
+                iter_chunks(),
+                make_id=chunk_point_id,
+                sparse_model=sparse_model,
             )
-            point_id += 1
+            with span("ingest.finish"):
+                # At the page limit Firecrawl may have left pages out; they are kept
+                complete = not failed and crawled < CRAWL_LIMIT
+                removed = index.finish(complete=complete, missing=missing)
+    except CrawlTimeout as e:
+        # The job keeps running on Firecrawl; the next run resumes it
+        print(f"⏱️ {e}")
+        return 0
+    except CrawlFailed as e:
+        jobs.forget(start_url)
+        print(f"❌ Crawl failed: {e}")
+        return 0
+    jobs.forget(start_url)
+
+    if total or removed:
+        # Tells the chat apps to drop cached search results
+        bump_collection_version(client_db, COLLECTION_NAME)
 
-    # 5. Push to Qdrant Cloud
-    if points:
-        client_db.upsert(collection_name=COLLECTION_NAME, points=points)
-        print(f"✅ Successfully ingested {point_id} points with deep links!")
+    if total:
+        print(f"✅ Successfully ingested {total} points with deep links!")
     else:
         print("⚠️ No data found to ingest.")
+    return total
 
 if __name__ == "__main__":
     run_deep_ingestion()
\ No newline at end of file
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / ".cache" / "answer_cache.sqlite3"
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.90"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+
+def chunk_ids_for(citations):
+    """Identifies retrieved chunks by point ID plus page content hash.
+
+    Point IDs are stable across re-ingests, so the hash is what tells a
+    cached answer that its page has changed underneath it.
+    """
+    return [f"{c.get('id')}:{c.get('content_hash') or ''}" for c in citations]
+
+
+def _context_key(chunk_ids):
+    return hashlib.sha256("|".join(sorted(str(i) for i in chunk_ids)).encode("utf-8")).hexdigest()
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Persistent answer cache for paraphrased questions over identical context.
+
+    A stored answer is reused when the retrieved chunk set is exactly the
+    same and the question embeddings have cosine similarity >= threshold.
+    Least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, context_key TEXT, question TEXT, "
+            "vector BLOB, answer TEXT, created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_context ON answers (context_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self._conn.commit()
+
+    def lookup(self, query_vector, chunk_ids):
+        """Returns a cached answer for this question + context, or None."""
+        query = _unit(query_vector)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector, answer FROM answers WHERE context_key = ?",
+                (_context_key(chunk_ids),),
+            ).fetchall()
+
+            best_id, best_answer, best_score = None, None, self.threshold
+            for row_id, blob, answer in rows:
+                score = float(np.dot(query, np.frombuffer(blob, dtype=np.float32)))
+                if score >= best_score:
+                    best_id, best_answer, best_score = row_id, answer, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), best_id))
+            self._conn.commit()
+            self.hits += 1
+            return best_answer
+
+    def store(self, question, query_vector, chunk_ids, answer):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (context_key, question, vector, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (_context_key(chunk_ids), question, _unit(query_vector).tobytes(), answer, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE id NOT IN "
+                "(SELECT id FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
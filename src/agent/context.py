@@ -0,0 +1,193 @@
+"""Token-budgeted context and chat history for the Groq prompt.
+
+pack_context() merges the retrieved chunks of each page, drops sentences an
+earlier chunk already carried (chunk overlap, repeated footers) and, when the
+rest does not fit CONTEXT_TOKENS, keeps the sentences that share the most
+keywords with the question. trim_history() keeps the latest exchange and
+the newest older turns that fit HISTORY_TOKENS. Both report how many tokens
+they saved.
+"""
+import os
+import re
+
+try:
+    from ..ingest.chunking import BLOCK_BOUNDARY, SENTENCE_BOUNDARY
+    from ..retrieval.multi_query import QUESTION_WORDS
+except ImportError:
+    from ingest.chunking import BLOCK_BOUNDARY, SENTENCE_BOUNDARY
+    from retrieval.multi_query import QUESTION_WORDS
+
+# Prompt budgets in (estimated) Llama tokens
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", 1200))
+HISTORY_TOKENS = int(os.getenv("HISTORY_TOKENS", 400))
+# Turns (question + answer) of history at most, whatever the budget
+HISTORY_TURNS = 3
+# English prose averages about 4 characters per Llama 3 token
+CHARS_PER_TOKEN = 4
+
+WORD = re.compile(r"[\w'-]+")
+
+
+def estimate_tokens(text):
+    """Approximate Llama token count; cheap enough to run per sentence, no tokenizer download."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def format_hit(text, url):
+    return f"Data: {text} | Link: {url}"
+
+
+def _sentences(text):
+    for block in BLOCK_BOUNDARY.split(text or ""):
+        for sentence in SENTENCE_BOUNDARY.split(block.strip()):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                yield sentence
+
+
+def _keywords(text):
+    # 5-character prefixes so "pricing" and "prices" still match
+    return {word[:5] for word in WORD.findall(text.lower()) if word not in QUESTION_WORDS}
+
+
+def pack_context(question, hits, budget_tokens=CONTEXT_TOKENS, count_tokens=estimate_tokens, separator="\n\n"):
+    """Builds the prompt context from ranked hits within budget_tokens.
+
+    Returns a dict with the context "text", its "tokens", the "raw_tokens"
+    of joining every hit in full (what the apps used to send), "saved_tokens"
+    and how many "sentences" were kept out of "sentences_total".
+    """
+    raw_tokens = count_tokens(separator.join(format_hit(hit["text"], hit["url"]) for hit in hits))
+
+    # One block per page, in rank order; overlapping chunks share sentences
+    pages, seen = {}, set()
+    for hit in hits:
+        page = pages.setdefault(hit.get("url") or hit["id"], {"url": hit.get("url", ""), "sentences": []})
+        for sentence in _sentences(hit.get("text")):
+            if sentence.lower() not in seen:
+                seen.add(sentence.lower())
+                page["sentences"].append(sentence)
+    pages = [page for page in pages.values() if page["sentences"]]
+
+    query = _keywords(question)
+    candidates = []  # (relevance, page rank, sentence index, tokens)
+    for rank, page in enumerate(pages):
+        page["overhead"] = count_tokens(format_hit("", page["url"]) + separator)
+        for index, sentence in enumerate(page["sentences"]):
+            relevance = len(query & _keywords(sentence)) / len(query) if query else 0.0
+            candidates.append((relevance, rank, index, count_tokens(sentence) + 1))
+
+    deduped_tokens = sum(page["overhead"] for page in pages) + sum(c[3] for c in candidates)
+    if deduped_tokens <= budget_tokens:
+        selected = {(rank, index) for _, rank, index, _ in candidates}
+    else:
+        # Most relevant sentences first; ties go to the better-ranked page
+        selected, used, opened = set(), 0, set()
+        for relevance, rank, index, tokens in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+            cost = tokens + (0 if rank in opened else pages[rank]["overhead"])
+            if used + cost > budget_tokens:
+                continue
+            selected.add((rank, index))
+            opened.add(rank)
+            used += cost
+        if not selected and candidates:
+            best = min(candidates, key=lambda c: (-c[0], c[1], c[2]))
+            selected.add((best[1], best[2]))
+
+    blocks = []
+    for rank, page in enumerate(pages):
+        kept = [sentence for index, sentence in enumerate(page["sentences"]) if (rank, index) in selected]
+        if kept:
+            blocks.append(format_hit(" ".join(kept), page["url"]))
+    text = separator.join(blocks)
+    tokens = count_tokens(text)
+    return {
+        "text": text,
+        "tokens": tokens,
+        "raw_tokens": raw_tokens,
+        "saved_tokens": max(raw_tokens - tokens, 0),
+        "sentences": len(selected),
+        "sentences_total": len(candidates),
+    }
+
+
+def _messages(history):
+    """Chat messages as {"role", "content"}, from the apps' message list or {"user", "assistant"} pairs."""
+    messages = []
+    for h in history if isinstance(history, list) else []:
+        if not isinstance(h, dict):
+            continue
+        if h.get("role") in ("user", "assistant") and h.get("content"):
+            messages.append({"role": h["role"], "content": str(h["content"])})
+        elif h.get("user") and h.get("assistant"):
+            messages.append({"role": "user", "content": str(h["user"])})
+            messages.append({"role": "assistant", "content": str(h["assistant"])})
+    return messages
+
+
+def _truncate(text, budget_tokens, count_tokens):
+    """Leading sentences (or words) of text within budget_tokens, ending in an ellipsis; "" if none fit."""
+    for units, joiner in ((list(_sentences(text)), " "), (text.split(), " ")):
+        kept = ""
+        for unit in units:
+            candidate = f"{kept}{joiner}{unit}" if kept else unit
+            if count_tokens(candidate + " …") > budget_tokens:
+                break
+            kept = candidate
+        if kept:
+            return kept + " …"
+    return ""
+
+
+def trim_history(history, question=None, budget_tokens=HISTORY_TOKENS, max_turns=HISTORY_TURNS,
+                 count_tokens=estimate_tokens):
+    """Newest messages of history that fit budget_tokens, as (messages, report).
+
+    The current question is dropped when it is already history's last
+    entry (the prompt adds it with the context). The latest exchange is
+    always kept, its answer cut to the budget if needed, so follow-up
+    questions keep their referent; older turns fill what is left. The kept
+    messages always start with a user turn.
+    """
+    messages = _messages(history)
+    if question and messages and messages[-1]["role"] == "user" and messages[-1]["content"].strip() == question.strip():
+        messages.pop()
+    sizes = [count_tokens(m["content"]) for m in messages]
+    raw_tokens = sum(sizes)
+
+    last_user = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=None)
+    if last_user is None:
+        return [], {"tokens": 0, "raw_tokens": raw_tokens, "saved_tokens": raw_tokens}
+    kept, used = [messages[last_user]], sizes[last_user]
+    for message, size in zip(messages[last_user + 1:], sizes[last_user + 1:]):
+        if used + size > budget_tokens:
+            content = _truncate(message["content"], budget_tokens - used, count_tokens)
+            if not content:
+                break
+            message, size = {**message, "content": content}, count_tokens(content)
+        kept.append(message)
+        used += size
+
+    start, turns = last_user, 1
+    while start > 0:
+        is_user = messages[start - 1]["role"] == "user"
+        if used + sizes[start - 1] > budget_tokens or (is_user and turns >= max_turns):
+            break
+        start -= 1
+        used += sizes[start]
+        turns += is_user
+    while start < last_user and messages[start]["role"] != "user":
+        used -= sizes[start]
+        start += 1
+
+    return messages[start:last_user] + kept, {"tokens": used, "raw_tokens": raw_tokens, "saved_tokens": raw_tokens - used}
+
+
+def format_report(context_report, history_report=None):
+    """One-line token summary for the apps' status panel."""
+    line = f"Context {context_report['raw_tokens']:,} → {context_report['tokens']:,} tokens"
+    saved = context_report["saved_tokens"]
+    if history_report is not None:
+        line += f" · history {history_report['raw_tokens']:,} → {history_report['tokens']:,}"
+        saved += history_report["saved_tokens"]
+    return f"{line} ({saved:,} saved)"
@@ -1,10 +1,22 @@
 import os
 import re
-from groq import Groq
+import time
 from dotenv import load_dotenv
 
+from .answer_cache import SemanticAnswerCache
+from .llm import LLMDeadlineExceeded, LLMUnavailable
+
+try:
+    from ..resources import get_llm_client
+    from ..tracing import add, span
+except ImportError:
+    # Imported as agent.gemini with src/ on sys.path (both apps, benchmarks)
+    from resources import get_llm_client
+    from tracing import add, span
+
 load_dotenv()
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Persistent, shared by every session in the process
+answer_cache = SemanticAnswerCache()
 
 def load_prompt_from_python(path):
     try:
@@ -30,36 +42,100 @@ def load_prompt_from_python(path):
 # Initialize once
 SYSTEM_PROMPT = load_prompt_from_python(os.path.join("prompts", "docs_agent_prompt.py"))
 
-def get_assistant_response(prompt, context, history):
+BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+SLOW_MESSAGE = "The answer is taking longer than usual. Please try again in a moment."
+
+def build_messages(prompt, context, history):
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    
+    # Add History (already trimmed to its token budget by agent.context.trim_history)
+    if isinstance(history, list):
+        for h in history:
+            if isinstance(h, dict) and h.get("role") in ("user", "assistant") and h.get("content"):
+                messages.append({"role": h["role"], "content": str(h["content"])})
+
+    # Prepare the grounded input
+    # Note: We tell the AI clearly what is context vs what is the question
+    grounded_input = (
+        f"TECHNICAL CONTEXT:\n{context}\n\n"
+        f"USER QUESTION: {prompt}"
+    )
+    messages.append({"role": "user", "content": grounded_input})
+    return messages
+
+def get_assistant_response(prompt, context, history, query_vector=None, chunk_ids=None):
+    """Answers prompt from context; pass the query embedding and retrieved
+    chunk IDs to let near-identical questions reuse a cached answer."""
+    use_cache = query_vector is not None and chunk_ids is not None
     try:
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        
-        # Add History
-        if isinstance(history, list):
-            for h in history[-3:]: # Increased to last 3 for better context
-                if isinstance(h, dict):
-                    user_val = h.get("user") or h.get("content")
-                    ast_val = h.get("assistant") or h.get("role")
-                    if user_val and ast_val:
-                        messages.append({"role": "user", "content": str(user_val)})
-                        messages.append({"role": "assistant", "content": str(ast_val)})
-
-        # Prepare the grounded input
-        # Note: We tell the AI clearly what is context vs what is the question
-        grounded_input = (
-            f"TECHNICAL CONTEXT:\n{context}\n\n"
-            f"USER QUESTION: {prompt}"
-        )
-        messages.append({"role": "user", "content": grounded_input})
+        if use_cache:
+            with span("answer_cache.lookup"):
+                cached = answer_cache.lookup(query_vector, chunk_ids)
+            if cached is not None:
+                return cached
+
+        with span("prompt.build"):
+            messages = build_messages(prompt, context, history)
+
+        # Groq API Call (deadline, retries and fallback model live in agent.llm)
+        with span("llm.completion"):
+            answer = get_llm_client().complete_sync(
+                messages,
+                temperature=0, # Keep it strictly factual
+            )
+
+        if use_cache and answer:
+            with span("answer_cache.store"):
+                answer_cache.store(prompt, query_vector, chunk_ids, answer)
+        return answer
 
-        # Groq API Call
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama-3.1-8b-instant",
+    except LLMDeadlineExceeded:
+        return SLOW_MESSAGE
+    except LLMUnavailable:
+        return BUSY_MESSAGE
+    except Exception as e:
+        return f"System Error: {str(e)}"
+
+def stream_assistant_response(prompt, context, history, query_vector=None, chunk_ids=None):
+    """Same as get_assistant_response, but yields text as Groq generates it."""
+    use_cache = query_vector is not None and chunk_ids is not None
+    try:
+        if use_cache:
+            with span("answer_cache.lookup"):
+                cached = answer_cache.lookup(query_vector, chunk_ids)
+            if cached is not None:
+                yield cached
+                return
+
+        with span("prompt.build"):
+            messages = build_messages(prompt, context, history)
+
+        # Timed by hand: a span must not stay open across yields
+        start = time.perf_counter()
+        stream = get_llm_client().stream_sync(
+            messages,
             temperature=0, # Keep it strictly factual
         )
-        
-        return chat_completion.choices[0].message.content
 
+        parts = []
+        for delta in stream:
+            if delta:
+                if not parts:
+                    add("llm.first_token", (time.perf_counter() - start) * 1000)
+                    start = time.perf_counter()
+                parts.append(delta)
+                yield delta
+        # Includes rendering the tokens, which is what the user waits for
+        add("llm.stream", (time.perf_counter() - start) * 1000)
+
+        answer = "".join(parts)
+        if use_cache and answer:
+            with span("answer_cache.store"):
+                answer_cache.store(prompt, query_vector, chunk_ids, answer)
+
+    except LLMDeadlineExceeded:
+        yield SLOW_MESSAGE
+    except LLMUnavailable:
+        yield BUSY_MESSAGE
     except Exception as e:
-        return f"System Error: {str(e)}"
+        yield f"System Error: {str(e)}"
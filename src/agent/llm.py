@@ -0,0 +1,240 @@
+"""Async Groq client shared by every chat session in the process.
+
+All completions go through one AsyncGroq on one httpx connection pool,
+running on a background event loop, so concurrent Streamlit sessions reuse
+warm connections instead of each blocking on its own. On top of the SDK:
+
+- a deadline per answer (LLM_DEADLINE seconds, retries included),
+- retries with full jitter on 429, 5xx and connection errors (the SDK's own
+  retries are off, they would ignore the deadline),
+- at most LLM_CONCURRENCY requests in flight,
+- a switch to GROQ_FALLBACK_MODEL while the main model is rate limited or
+  answers slower than the time left.
+
+GROQ_BASE_URL points the client at another server, e.g. the mock in
+benchmarks/llm_load.py.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+MODEL_NAME = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# Only used when it differs from MODEL_NAME, e.g. GROQ_MODEL=llama-3.3-70b-versatile
+FALLBACK_MODEL_NAME = os.getenv("GROQ_FALLBACK_MODEL", "llama-3.1-8b-instant")
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+CONNECT_TIMEOUT = 5.0
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMUnavailable(RuntimeError):
+    pass
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    def __init__(self, deadline):
+        super().__init__(f"No answer from Groq within {deadline:.0f}s")
+        self.deadline = deadline
+
+
+def _retryable(error):
+    import groq
+
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRY_STATUSES
+    return isinstance(error, groq.APIConnectionError)
+
+
+def _timed_out(error):
+    import groq
+
+    return isinstance(error, groq.APITimeoutError)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class EventLoopThread:
+    """An asyncio loop on a daemon thread, driven from synchronous code."""
+
+    def __init__(self, name="llm-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self, coro):
+        """Runs coro on the loop and blocks until it returns (or raises)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen):
+        """Synchronous iterator over an async generator running on the loop."""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+
+class LLMClient:
+    """Groq chat completions with a deadline, retries, a concurrency limit and a fallback model.
+
+    complete() and stream() are coroutines for the loop the client runs on;
+    complete_sync() and stream_sync() call them from any thread through the
+    client's EventLoopThread. sleep, clock and jitter are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=None,
+        model=MODEL_NAME,
+        fallback_model=FALLBACK_MODEL_NAME,
+        deadline=LLM_DEADLINE,
+        max_retries=LLM_MAX_RETRIES,
+        concurrency=LLM_CONCURRENCY,
+        runner=None,
+        sleep=asyncio.sleep,
+        clock=time.monotonic,
+        jitter=random.random,
+    ):
+        import httpx
+        from groq import AsyncGroq
+
+        self.model = model
+        self.fallback_model = fallback_model or model
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.runner = runner or EventLoopThread()
+        self.sleep = sleep
+        self.clock = clock
+        self.jitter = jitter
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=httpx.Timeout(deadline, connect=CONNECT_TIMEOUT),
+        )
+        self.client = AsyncGroq(
+            api_key=api_key or os.getenv("GROQ_API_KEY"), base_url=base_url, http_client=self.http, max_retries=0
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Seconds to the full answer (complete) or first token (stream), per model
+        self.latency = {}
+        self.stats = {"requests": 0, "retries": 0, "fallbacks": 0, "failures": 0}
+        self._limited_until = {}
+
+    def _pick_model(self, remaining, stream):
+        if self.fallback_model == self.model:
+            return self.model
+        expected = self.latency.get((self.model, stream))
+        if self._limited_until.get(self.model, 0) > self.clock() or (expected is not None and expected > remaining):
+            self.stats["fallbacks"] += 1
+            return self.fallback_model
+        return self.model
+
+    def _observe(self, model, stream, seconds):
+        key = (model, stream)
+        previous = self.latency.get(key)
+        self.latency[key] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def _remaining(self, deadline_at):
+        remaining = deadline_at - self.clock()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded(self.deadline)
+        return remaining
+
+    async def _backoff(self, error, attempt, model, deadline_at):
+        if attempt > self.max_retries:
+            self.stats["failures"] += 1
+            raise LLMUnavailable(f"Groq failed after {attempt} attempts: {error}") from error
+        wait = self.jitter() * min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        retry_after = _retry_after(error)
+        if getattr(error, "status_code", None) == 429:
+            self._limited_until[model] = self.clock() + max(retry_after or 0.0, wait)
+            # Without another model to switch to, honour the server's Retry-After
+            if retry_after and self.fallback_model == model:
+                wait = max(wait, retry_after)
+        if self.clock() + wait >= deadline_at:
+            self.stats["failures"] += 1
+            raise LLMDeadlineExceeded(self.deadline) from error
+        self.stats["retries"] += 1
+        await self.sleep(wait)
+
+    async def complete(self, messages, deadline=None, **params):
+        """Returns the answer text; raises LLMDeadlineExceeded or LLMUnavailable."""
+        deadline_at = self.clock() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            model = self._pick_model(deadline_at - self.clock(), stream=False)
+            start = self.clock()
+            try:
+                async with self.semaphore:
+                    start = self.clock()
+                    self.stats["requests"] += 1
+                    response = await self.client.chat.completions.create(
+                        messages=messages, model=model, timeout=self._remaining(deadline_at), **params
+                    )
+                self._observe(model, False, self.clock() - start)
+                return response.choices[0].message.content
+            except Exception as error:
+                if not _retryable(error):
+                    raise
+                if _timed_out(error):
+                    # A lower bound on this model's latency, enough to prefer the fallback next time
+                    self._observe(model, False, self.clock() - start)
+                attempt += 1
+                await self._backoff(error, attempt, model, deadline_at)
+
+    async def stream(self, messages, deadline=None, **params):
+        """Yields the answer text as it is generated.
+
+        The deadline covers getting the first token; once text has been
+        yielded a failure is raised instead of retried.
+        """
+        deadline_at = self.clock() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            model = self._pick_model(deadline_at - self.clock(), stream=True)
+            started = False
+            start = self.clock()
+            try:
+                # Held for the whole stream: it occupies a connection until the last token
+                async with self.semaphore:
+                    start = self.clock()
+                    self.stats["requests"] += 1
+                    response = await self.client.chat.completions.create(
+                        messages=messages, model=model, stream=True, timeout=self._remaining(deadline_at), **params
+                    )
+                    async with response:
+                        async for chunk in response:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                if not started:
+                                    self._observe(model, True, self.clock() - start)
+                                    started = True
+                                yield delta
+                return
+            except Exception as error:
+                if started or not _retryable(error):
+                    raise
+                if _timed_out(error):
+                    self._observe(model, True, self.clock() - start)
+                attempt += 1
+                await self._backoff(error, attempt, model, deadline_at)
+
+    def complete_sync(self, messages, deadline=None, **params):
+        return self.runner.run(self.complete(messages, deadline, **params))
+
+    def stream_sync(self, messages, deadline=None, **params):
+        return self.runner.iterate(self.stream(messages, deadline, **params))
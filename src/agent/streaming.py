@@ -0,0 +1,84 @@
+import re
+
+SOURCE_LINK_MARKER = "SOURCE_LINK:"
+URL_PATTERN = re.compile(r"\[?(https?://[^\s\])]+)")
+
+
+class SourceLinkFilter:
+    """Strips the SOURCE_LINK marker line out of a token stream.
+
+    Text is passed through as it arrives, except for a short tail that could
+    still turn into the marker. Once the stream is done, source_url holds the
+    link the model cited (or None).
+    """
+
+    def __init__(self, marker=SOURCE_LINK_MARKER):
+        self.marker = marker
+        self.source_url = None
+        self._pending = ""
+        self._in_marker = False
+        self._marker_text = ""
+
+    def _partial_marker_length(self, text):
+        # Longest suffix of text that is also a prefix of the marker
+        for size in range(min(len(self.marker) - 1, len(text)), 0, -1):
+            if self.marker.startswith(text[-size:]):
+                return size
+        return 0
+
+    def _end_marker(self):
+        match = URL_PATTERN.search(self._marker_text)
+        if match and self.source_url is None:
+            self.source_url = match.group(1)
+        self._in_marker = False
+        self._marker_text = ""
+
+    def _push(self, token):
+        text = self._pending + token
+        self._pending = ""
+        visible = []
+
+        while text:
+            if self._in_marker:
+                if not self._marker_text.strip():
+                    # Like the non-streaming regex, the URL may follow on the next line
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                # The marker then runs to the end of the URL's line
+                newline = text.find("\n")
+                if newline < 0:
+                    self._marker_text += text
+                    text = ""
+                else:
+                    self._marker_text += text[:newline]
+                    text = text[newline:]
+                    self._end_marker()
+                continue
+
+            start = text.find(self.marker)
+            if start >= 0:
+                visible.append(text[:start])
+                text = text[start + len(self.marker):]
+                self._in_marker = True
+                continue
+
+            held = self._partial_marker_length(text)
+            visible.append(text[:len(text) - held])
+            self._pending = text[len(text) - held:]
+            text = ""
+
+        return "".join(visible)
+
+    def feed(self, tokens):
+        """Yields the visible text of a token iterator, marker removed."""
+        for token in tokens:
+            visible = self._push(token)
+            if visible:
+                yield visible
+
+        if self._in_marker:
+            self._end_marker()
+        elif self._pending:
+            yield self._pending
+            self._pending = ""
@@ -0,0 +1,262 @@
+"""Answers a JSONL file of questions without the chat UI.
+
+Each input line is {"question": ..., "id": ..., "history": [chat messages]}
+(only "question" is required). Retrieval runs for all questions at once:
+one embedding pass and batched query_batch_points calls. Answers are then
+requested concurrently, at most --concurrency at a time and --rpm per
+minute. With --output, every question gets one JSON line with the answer,
+citations, context token counts and per-stage timings.
+
+Answers go through the same persistent answer cache as the apps, so
+running the questions users ask most before a deploy means their first
+ask is served from the cache (--no-answer-cache skips it, e.g. for
+evaluation). --app picks the retrieval settings of src/main.py ("main") or
+Docling/chatbot_ui_docling.py ("docling"); keep APPS in sync with them.
+
+Usage: python src/batch_qa.py questions.jsonl --output answers.jsonl --app main --rpm 30
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agent.answer_cache import chunk_ids_for
+    from agent.context import pack_context, trim_history
+    from agent.gemini import answer_cache, build_messages
+    from agent.llm import LLMClient, LLM_CONCURRENCY, LLMDeadlineExceeded, LLMUnavailable
+    from agent.streaming import SOURCE_LINK_MARKER, URL_PATTERN
+    from resources import get_embed_model, get_qdrant_client, get_reranker, get_sparse_model
+    from retrieval.multi_query import RERANK_MODEL_NAME, batch_multi_query_search
+    from retrieval.search import NOISE_CONTENT_TYPES, apply_score_threshold, build_filter, is_hybrid_collection
+else:
+    from .agent.answer_cache import chunk_ids_for
+    from .agent.context import pack_context, trim_history
+    from .agent.gemini import answer_cache, build_messages
+    from .agent.llm import LLMClient, LLM_CONCURRENCY, LLMDeadlineExceeded, LLMUnavailable
+    from .agent.streaming import SOURCE_LINK_MARKER, URL_PATTERN
+    from .resources import get_embed_model, get_qdrant_client, get_reranker, get_sparse_model
+    from .retrieval.multi_query import RERANK_MODEL_NAME, batch_multi_query_search
+    from .retrieval.search import NOISE_CONTENT_TYPES, apply_score_threshold, build_filter, is_hybrid_collection
+
+load_dotenv()
+
+# Retrieval and prompt settings of each chat app
+APPS = {
+    "main": {
+        "collection": "tarento_knowledge",
+        "limit": 3,
+        "threshold": 0.45,
+        "gate": "top",
+        "default_title": "Tarento Solution",
+        "separator": "\n\n",
+        "history": True,
+    },
+    "docling": {
+        "collection": "tarento_web_data",
+        "limit": 8,
+        "threshold": 0.30,
+        "gate": "each",
+        "default_title": "Tarento Page",
+        "separator": "\n",
+        "history": False,  # the Docling app does not send chat history
+    },
+}
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / per_minute seconds apart (no limit when per_minute is 0)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def read_questions(path):
+    items = []
+    for number, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"question": item}
+        items.append({"id": item.get("id", number), "question": item["question"], "history": item.get("history")})
+    return items
+
+
+def split_source_link(answer):
+    """(answer without the SOURCE_LINK line, the cited URL or None), as the apps display it."""
+    marker = answer.find(SOURCE_LINK_MARKER)
+    if marker < 0:
+        return answer.strip(), None
+    match = URL_PATTERN.search(answer, marker)
+    return re.sub(r"SOURCE_LINK:.*", "", answer).strip(), match.group(1) if match else None
+
+
+def retrieve(items, app, reranker, include_noise=False):
+    """Batched retrieval plus context packing for every item; returns (rows, batch timings)."""
+    client = get_qdrant_client()
+    try:
+        hybrid = is_hybrid_collection(client, app["collection"])
+    except Exception:
+        hybrid = False
+    query_filter = build_filter(exclude_content_types=None if include_noise else NOISE_CONTENT_TYPES)
+    results, timings = batch_multi_query_search(
+        client,
+        get_embed_model(),
+        app["collection"],
+        [item["question"] for item in items],
+        limit=app["limit"],
+        histories=[item["history"] for item in items],
+        reranker=reranker,
+        default_title=app["default_title"],
+        sparse_model=get_sparse_model() if hybrid else None,
+        query_filter=query_filter,
+    )
+
+    rows = []
+    for item, (hits, query_vec, row_timings) in zip(items, results):
+        start = time.perf_counter()
+        context_hits = apply_score_threshold(hits, app["threshold"], gate=app["gate"])
+        history, _ = trim_history(item["history"], item["question"]) if app["history"] else ([], None)
+        if context_hits:
+            packed = pack_context(item["question"], context_hits, separator=app["separator"])
+            context_text = packed["text"]
+        else:
+            packed = None
+            context_text = "NO_CONTEXT_AVAILABLE"
+        row_timings["context"] = round((time.perf_counter() - start) * 1000, 2)
+        rows.append({
+            **item,
+            "history": history,
+            "context": context_text,
+            "query_vector": query_vec,
+            "chunk_ids": chunk_ids_for(context_hits),
+            "citations": [
+                {"url": hit["url"], "title": hit["title"], "score": round(hit["score"], 4)} for hit in context_hits
+            ],
+            "context_tokens": packed["tokens"] if packed else 0,
+            "tokens_saved": packed["saved_tokens"] if packed else 0,
+            "timings": row_timings,
+        })
+    return rows, timings
+
+
+async def answer_all(rows, llm, limiter, use_cache=True):
+    async def answer(row):
+        timings = row["timings"]
+        start = time.perf_counter()
+        cached = answer_cache.lookup(row["query_vector"], row["chunk_ids"]) if use_cache else None
+        timings["answer_cache"] = round((time.perf_counter() - start) * 1000, 2)
+        row["cached"] = cached is not None
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        await limiter.wait()
+        timings["rate_limit_wait"] = round((time.perf_counter() - start) * 1000, 2)
+        start = time.perf_counter()
+        try:
+            text = await llm.complete(
+                build_messages(row["question"], row["context"], row["history"]),
+                temperature=0,  # same as the apps, so cached answers match
+            )
+        finally:
+            timings["llm"] = round((time.perf_counter() - start) * 1000, 2)
+        if use_cache and text:
+            answer_cache.store(row["question"], row["query_vector"], row["chunk_ids"], text)
+        return text
+
+    async def one(row):
+        try:
+            text = await answer(row)
+            row["answer"], row["source_link"] = split_source_link(text or "")
+        except (LLMDeadlineExceeded, LLMUnavailable) as e:
+            row["error"] = str(e)
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+
+    await asyncio.gather(*(one(row) for row in rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("questions", type=Path, help="JSONL file, one question per line")
+    parser.add_argument("--output", type=Path, help="write one JSON line per question")
+    parser.add_argument("--app", choices=APPS, default="main")
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="LLM requests in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="LLM requests per minute (0 = no limit)")
+    parser.add_argument("--no-rerank", action="store_true", help=f"skip the {RERANK_MODEL_NAME} reranker")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always ask the LLM and store nothing")
+    parser.add_argument("--include-noise", action="store_true", help="also search contact/legal pages")
+    args = parser.parse_args()
+
+    app = APPS[args.app]
+    items = read_questions(args.questions)
+    if not items:
+        print(f"No questions in {args.questions}")
+        return
+    start = time.perf_counter()
+
+    reranker = None
+    if not args.no_rerank:
+        try:
+            reranker = get_reranker()
+        except Exception as e:
+            print(f"Reranker unavailable, using vector-score order: {e}")
+    rows, batch_timings = retrieve(items, app, reranker, args.include_noise)
+    print(
+        f"Retrieved context for {len(rows)} questions in {batch_timings['total']:.0f} ms ("
+        + " · ".join(f"{stage} {ms:.0f} ms" for stage, ms in batch_timings.items() if stage != "total")
+        + ")"
+    )
+
+    llm = LLMClient(concurrency=args.concurrency)
+    llm.runner.run(answer_all(rows, llm, RateLimiter(args.rpm), use_cache=not args.no_answer_cache))
+
+    errors = [row for row in rows if "error" in row]
+    cached = sum(1 for row in rows if row.get("cached"))
+    llm_ms = [row["timings"]["llm"] for row in rows if "llm" in row["timings"]]
+    print(
+        f"Answered {len(rows) - len(errors)}/{len(rows)} ({cached} from cache, {len(errors)} failed) "
+        f"in {time.perf_counter() - start:.1f}s"
+        + (f"; LLM p50 {statistics.median(llm_ms):.0f} ms" if llm_ms else "")
+        + f"; {sum(row['tokens_saved'] for row in rows):,} context tokens saved"
+        + (f"; retries {llm.stats['retries']}, fallbacks {llm.stats['fallbacks']}" if llm_ms else "")
+    )
+    for row in errors[:5]:
+        print(f"  {row['id']}: {row['error']}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            for row in rows:
+                record = {key: row.get(key) for key in (
+                    "id", "question", "answer", "source_link", "cached", "error",
+                    "citations", "context_tokens", "tokens_saved", "timings",
+                )}
+                record["timings"]["batch"] = batch_timings
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from qdrant_client import models
+
+from .payload_fields import SOURCE_FIELD
+from .pipeline import ensure_collection
+
+try:
+    from ..tracing import span
+except ImportError:
+    from tracing import span
+
+# Builds go into "<alias>__<timestamp>" collections (to the microsecond, so
+# names still sort by build time); the alias the apps query
+# is switched over in one atomic request once a build succeeded.
+VERSION_SEPARATOR = "__"
+# Previous builds kept around for a manual rollback (re-point the alias)
+KEEP_PREVIOUS_VERSIONS = 1
+
+
+def live_collection(client, alias):
+    """Name of the collection alias points at, or None if it is not an alias."""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def new_collection_name(client, alias):
+    """A versioned collection name for alias that no existing collection uses."""
+    while True:
+        name = f"{alias}{VERSION_SEPARATOR}{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        if not client.collection_exists(name):
+            return name
+        time.sleep(0.001)
+
+
+def drop_build(client, alias, collection_name):
+    """Deletes an unpublished build, unless alias serves it after all."""
+    if collection_name == live_collection(client, alias):
+        print(f"⚠️ {collection_name!r} is live; not deleting it.")
+        return
+    client.delete_collection(collection_name)
+
+
+def publish(client, alias, collection_name, keep=KEEP_PREVIOUS_VERSIONS):
+    """Atomically points alias at collection_name, then drops old versions."""
+    operations = []
+    if live_collection(client, alias) is not None:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        # One-off migration: a plain collection still holds the alias name
+        print(f"🔁 Replacing plain collection {alias!r} with an alias.")
+        client.delete_collection(alias)
+    operations.append(
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias))
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    print(f"🔀 {alias!r} now serves {collection_name!r}.")
+    garbage_collect(client, alias, keep)
+
+
+def garbage_collect(client, alias, keep=KEEP_PREVIOUS_VERSIONS):
+    """Deletes versioned collections of alias except the live one and the `keep` newest others."""
+    live = live_collection(client, alias)
+    previous = sorted(
+        collection.name
+        for collection in client.get_collections().collections
+        if collection.name.startswith(alias + VERSION_SEPARATOR) and collection.name != live
+    )
+    stale = previous[:-keep] if keep else previous
+    for name in stale:
+        client.delete_collection(name)
+    return stale
+
+
+def carry_over(client, from_collection, to_collection, source, batch_size=256):
+    """Copies the points other ingesters wrote to from_collection; returns how many.
+
+    Points of source itself and points without an ingest_source are left
+    behind: the running ingester rewrites its own pages.
+    """
+    others = models.Filter(
+        must_not=[
+            models.FieldCondition(key=SOURCE_FIELD, match=models.MatchValue(value=source)),
+            models.IsEmptyCondition(is_empty=models.PayloadField(key=SOURCE_FIELD)),
+        ]
+    )
+    copied, offset = 0, None
+    while True:
+        points, offset = client.scroll(
+            collection_name=from_collection,
+            scroll_filter=others,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            client.upsert(
+                collection_name=to_collection,
+                points=[models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=False,
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def flush(client, collection_name):
+    """Returns once every earlier wait=False upsert to collection_name is applied."""
+    # A waited no-op update queues behind them
+    with span("ingest.flush"):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=[]),
+            wait=True,
+        )
+
+
+class IngestTarget:
+    """Where an ingest run writes; set points to the number of points it wrote."""
+
+    def __init__(self, collection_name, fresh):
+        self.collection_name = collection_name
+        self.fresh = fresh
+        self.points = 0
+
+
+@contextmanager
+def ingest_target(client, alias, rebuild=False, hybrid=False, source=None):
+    """Yields the IngestTarget an ingest run should write to.
+
+    Incremental runs update the live collection in place. Full rebuilds (and
+    the first run, or a switch to/from hybrid vectors) fill a fresh versioned
+    collection that only goes live, via the alias, if the run succeeded and
+    wrote points; the apps keep serving the old one meanwhile. With a source
+    (see IncrementalIndex) a rebuild starts from the other ingesters' points.
+    Either way every upsert is applied when the block exits, so a collection
+    version bump after it never lets the apps cache pre-ingest results.
+    """
+    live = live_collection(client, alias)
+    live_hybrid = bool(client.get_collection(live).config.params.sparse_vectors) if live else None
+    if live and not rebuild:
+        if live_hybrid == hybrid:
+            ensure_collection(client, live, hybrid=hybrid)
+            yield IngestTarget(live, fresh=False)
+            flush(client, live)
+            return
+        print("ℹ️ HYBRID_SEARCH changed; rebuilding into a new collection.")
+
+    target = IngestTarget(new_collection_name(client, alias), fresh=True)
+    ensure_collection(client, target.collection_name, hybrid=hybrid)
+    if source and live:
+        if live_hybrid == hybrid:
+            with span("ingest.carry_over"):
+                carried = carry_over(client, live, target.collection_name, source)
+            if carried:
+                print(f"📎 Keeping {carried} points other ingesters wrote to {alias!r}.")
+        else:
+            print(f"ℹ️ Vectors changed; other ingesters writing to {alias!r} must re-run too.")
+    try:
+        yield target
+    except BaseException:
+        drop_build(client, alias, target.collection_name)
+        raise
+
+    flush(client, target.collection_name)
+    if not target.points:
+        # Never swap a working collection for an empty one (e.g. the crawl failed)
+        print("⚠️ Nothing was ingested; keeping the current collection live.")
+        drop_build(client, alias, target.collection_name)
+        return
+    with span("ingest.publish"):
+        publish(client, alias, target.collection_name)
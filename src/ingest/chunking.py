@@ -0,0 +1,208 @@
+import re
+
+# bge-small truncates at 512 tokens including [CLS]/[SEP]; stay well below so
+# the small-chunk merge below never pushes a chunk past what the model reads.
+CHUNK_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 48
+MIN_CHUNK_TOKENS = 64
+# Bump when chunking output changes so incremental ingest re-embeds every page
+CHUNKER_VERSION = "tokens-v3"
+
+BLOCK_BOUNDARY = re.compile(r"\n\s*\n|\n(?=#{1,6}\s)")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+HEADING = re.compile(r"#{1,6}\s")
+
+
+def load_token_counter(embed_model=None):
+    """Returns count_tokens(text) backed by the embedding model's own tokenizer.
+
+    The tokenizer is copied from the fastembed model (the shared
+    get_embed_model() by default), which already has it in its cache: no
+    second download, and OFFLINE_REPLAY keeps working without network. The
+    copy counts past the model's 512-token truncation.
+    """
+    from tokenizers import Tokenizer
+
+    if embed_model is None:
+        try:
+            from ..resources import get_embed_model
+        except ImportError:
+            from resources import get_embed_model
+        embed_model = get_embed_model()
+    tokenizer = Tokenizer.from_str(embed_model.model.tokenizer.to_str())
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+
+    def count_tokens(text):
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    return count_tokens
+
+
+class Chunker:
+    """Packs headings, paragraphs and sentences into token-budgeted chunks.
+
+    Every piece of text is tokenized a bounded number of times and packed
+    greedily, so chunking is linear in the input size. A new heading starts a
+    new chunk once the current one is big enough, and headings never end a
+    chunk: they move on with the text they introduce. Consecutive chunks in a
+    section share up to overlap_tokens of trailing text. A piece that does
+    not fit after a heading or a chunk under min_tokens is split into lines,
+    sentences or words to fill that chunk, and any chunk still under
+    min_tokens is folded into a neighbour when it fits.
+    """
+
+    def __init__(
+        self,
+        count_tokens=None,
+        max_tokens=CHUNK_TOKENS,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        min_tokens=MIN_CHUNK_TOKENS,
+    ):
+        self.count_tokens = count_tokens or load_token_counter()
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+
+    def _split_words(self, sentence):
+        # Last resort for run-on text with no sentence punctuation
+        words, tokens = [], 0
+        for word in sentence.split():
+            size = self.count_tokens(word)
+            if words and tokens + size > self.max_tokens:
+                yield " ".join(words), tokens
+                words, tokens = [], 0
+            words.append(word)
+            tokens += size
+        if words:
+            yield " ".join(words), tokens
+
+    def _pieces(self, text):
+        """Yields (text, tokens, separator, starts_section) for each packable piece."""
+        for block in BLOCK_BOUNDARY.split(text):
+            block = block.strip()
+            if not block:
+                continue
+            is_heading = bool(HEADING.match(block))
+            tokens = self.count_tokens(block)
+            if tokens <= self.max_tokens:
+                yield block, tokens, "\n\n", is_heading
+                continue
+
+            separator = "\n\n"
+            for sentence in SENTENCE_BOUNDARY.split(block):
+                tokens = self.count_tokens(sentence)
+                parts = [(sentence, tokens)] if tokens <= self.max_tokens else self._split_words(sentence)
+                for part, part_tokens in parts:
+                    yield part, part_tokens, separator, is_heading
+                    separator, is_heading = " ", False
+
+    def _finer(self, piece, separator, starts_section):
+        """Splits a piece into its lines, else sentences, else words; [] for a single word."""
+        for pattern, joiner in ((r"\n", "\n"), (SENTENCE_BOUNDARY, " "), (r"\s+", " ")):
+            parts = [part for part in re.split(pattern, piece) if part.strip()]
+            if len(parts) > 1:
+                break
+        else:
+            return []
+        finer = []
+        for part in parts:
+            finer.append((part.strip(), self.count_tokens(part), separator, starts_section))
+            separator, starts_section = joiner, False
+        return finer
+
+    @staticmethod
+    def _trailing_headings(pieces):
+        count = 0
+        for piece in reversed(pieces):
+            if not Chunker._is_heading(piece):
+                break
+            count += 1
+        return pieces[len(pieces) - count:]
+
+    def _overlap_tail(self, pieces):
+        tail, tokens = [], 0
+        for piece in reversed(pieces[1:]):
+            if tokens + piece[1] > self.overlap_tokens:
+                break
+            tail.insert(0, piece)
+            tokens += piece[1]
+        return tail
+
+    def _join(self, pieces):
+        text = pieces[0][0]
+        for piece, _, separator in pieces[1:]:
+            text += separator + piece
+        return text
+
+    @staticmethod
+    def _is_heading(piece):
+        return bool(HEADING.match(piece[0])) and "\n" not in piece[0]
+
+    def _fold_small(self, chunks):
+        """Merges chunks under min_tokens into a neighbour that has room for them."""
+        folded = []
+        for chunk in chunks:
+            if folded:
+                previous, small = folded[-1], None
+                if chunk[1] < self.min_tokens:
+                    small = "this"
+                elif previous[1] < self.min_tokens:
+                    small = "previous"
+                extra = chunk[0][chunk[2]:]
+                extra_tokens = sum(p[1] for p in extra)
+                # A chunk ending in a heading only merges forward, so the heading stays with its text
+                backward_ok = small == "previous" or not self._is_heading(chunk[0][-1])
+                if small and backward_ok and previous[1] + extra_tokens <= self.max_tokens:
+                    previous[0] = previous[0] + extra
+                    previous[1] += extra_tokens
+                    continue
+            folded.append(chunk)
+        return folded
+
+    def split(self, text):
+        """Returns the chunk texts for one document."""
+        chunks = []  # [pieces, tokens, number of leading overlap pieces]
+        current, current_tokens, overlap = [], 0, 0
+        pieces = self._pieces(text)
+        refined = []  # finer pieces of a piece that did not fit, next one last
+
+        while True:
+            if refined:
+                piece, tokens, separator, starts_section = refined.pop()
+            else:
+                piece, tokens, separator, starts_section = next(pieces, (None, 0, None, False))
+                if piece is None:
+                    break
+            new_section = starts_section and current_tokens >= self.min_tokens
+            if current and (new_section or current_tokens + tokens > self.max_tokens):
+                # Headings with no text under them yet are carried into the next chunk
+                pending = self._trailing_headings(current)
+                body = current[:len(current) - len(pending)]
+                fresh_tokens = sum(p[1] for p in body[overlap:])
+                if not new_section and (pending or 0 < fresh_tokens < self.min_tokens):
+                    # Rather than leave a heading or a sliver of text on its own, pack part of this piece
+                    finer = self._finer(piece, separator, starts_section)
+                    if finer:
+                        refined.extend(reversed(finer))
+                        continue
+                if len(body) > overlap:
+                    chunks.append([body, sum(p[1] for p in body), overlap])
+                    current = pending or ([] if new_section else self._overlap_tail(body))
+                else:
+                    # Nothing but overlap so far; a new section drops it
+                    current = pending
+                current_tokens = sum(p[1] for p in current)
+                if current_tokens + tokens > self.max_tokens:
+                    if pending:
+                        # Only when the heading and a single word after it cannot share a chunk
+                        chunks.append([pending, current_tokens, 0])
+                    current, current_tokens = [], 0
+                overlap = 0 if pending else len(current)
+            current.append((piece, tokens, separator))
+            current_tokens += tokens
+
+        if current and current_tokens > sum(p[1] for p in current[:overlap]):
+            chunks.append([current, current_tokens, overlap])
+
+        return [self._join(pieces) for pieces, _, _ in self._fold_small(chunks)]
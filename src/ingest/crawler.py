@@ -0,0 +1,222 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import httpx
+
+from .fetch_cache import conditional_headers, store_response
+from .frontier import Frontier
+from .incremental import GONE_STATUSES
+
+DEFAULT_HEADERS = {"User-Agent": "TarentoKnowledgeBot/1.0 (+https://www.tarento.com)"}
+
+
+class CrawlEngine:
+    """Async BFS crawler with a pooled HTTP client and per-host politeness.
+
+    After run(), requests is the number of GETs sent, failed maps URLs that could not be fetched or parsed to the
+    error, missing holds URLs that answered 404 / 410 and complete tells
+    whether every reachable page was crawled (no failures, no page limit
+    hit, not stopped early).
+    """
+
+    def __init__(
+        self,
+        max_concurrency=16,
+        per_host_concurrency=8,
+        politeness_delay=0.0,
+        timeout=10,
+        headers=None,
+        cache=None,
+        offline=False,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.politeness_delay = politeness_delay
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        # A FetchCache enables conditional requests; offline replays it only
+        self.cache = cache
+        self.offline = offline
+        self.requests = 0
+        self.failed = {}
+        self.missing = set()
+        self.truncated = False
+
+    def _make_client(self):
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=True,
+        )
+
+    async def _wait_for_host(self, host):
+        # Reserve the next free slot for this host before sleeping, so
+        # concurrent workers queue up behind each other instead of bursting.
+        if not self.politeness_delay:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot[host])
+        self._next_slot[host] = slot + self.politeness_delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _fetch(self, client, url):
+        """Returns (html, base_url); base_url is where the page was served after redirects."""
+        entry = self.cache.get(url) if self.cache else None
+        if self.offline:
+            if entry is None:
+                raise LookupError(f"{url} is not in the fetch cache")
+            return entry.body, entry.final_url or url
+
+        host = urlparse(url).netloc
+        async with self._host_slots[host]:
+            await self._wait_for_host(host)
+            self.requests += 1
+            response = await client.get(url, headers=conditional_headers(entry))
+
+        # Relative links resolve against this, not the canonical URL: "/services/"
+        # canonicalizes to "/services", which would turn "anuvaad" into "/anuvaad"
+        base_url = str(response.url)
+        if response.status_code >= 400:
+            if entry is not None and response.status_code >= 500:
+                # A server error says nothing about the page; keep serving the last good copy
+                print(f"⚠️ {url} answered {response.status_code}; using the cached copy")
+                return entry.body, entry.final_url or base_url
+            # 404 / 5xx error pages must never be indexed as content
+            response.raise_for_status()
+        if self.cache is None:
+            return response.text, base_url
+        body = store_response(
+            self.cache, url, entry, response.status_code, response.text, response.headers, final_url=base_url
+        )
+        return body, base_url
+
+    async def _process(self, client, url, frontier, handle_page, on_result):
+        try:
+            html, base_url = await self._fetch(client, url)
+            links, result = handle_page(url, html, base_url)
+            for link in links:
+                frontier.add(link)
+            if result is not None:
+                await on_result(result)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in GONE_STATUSES:
+                self.missing.add(url)
+                print(f"🚫 Gone ({e.response.status_code}): {url}")
+            else:
+                self.failed[url] = str(e)
+                print(f"⚠️ Error on {url}: {e}")
+        except Exception as e:
+            self.failed[url] = str(e)
+            print(f"⚠️ Error on {url}: {e}")
+
+    @property
+    def complete(self):
+        return not self.failed and not self.truncated
+
+    def stop(self):
+        """Stops dispatching new fetches; in-flight ones are allowed to finish."""
+        self._stopped = True
+
+    async def run(self, seed_url, max_pages, handle_page, on_result=None):
+        """Crawls from seed_url and returns whatever handle_page produced.
+
+        handle_page(url, html, base_url) must return a (links, result) tuple;
+        url is the canonical URL (use it for IDs and dedup), base_url the one
+        the page was served from, to resolve relative links against. Links are
+        queued for crawling and non-None results are collected. Pass an async
+        on_result callback to receive results as they arrive instead.
+        """
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+        self._next_slot = defaultdict(float)
+        self._stopped = False
+        self.requests, self.failed, self.missing, self.truncated = 0, {}, set(), False
+
+        frontier = Frontier([seed_url], limit=max_pages)
+        results = []
+        in_flight = set()
+        started = 0
+
+        if on_result is None:
+            async def on_result(result):
+                results.append(result)
+
+        async with self._make_client() as client:
+            while (frontier and not self._stopped) or in_flight:
+                # Keep at most max_concurrency fetches running at any time
+                while frontier and not self._stopped and len(in_flight) < self.max_concurrency:
+                    url = frontier.pop()
+                    started += 1
+                    print(f"🔍 Scraping ({started}/{max_pages}): {url}")
+                    in_flight.add(asyncio.create_task(
+                        self._process(client, url, frontier, handle_page, on_result)
+                    ))
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+        # Pages past the limit (or never dispatched) were not checked, not removed
+        self.truncated = self._stopped or frontier.dropped > 0
+        return results
+
+
+def crawl(seed_url, max_pages, handle_page, **engine_options):
+    """Blocking entry point for scripts that are not async themselves."""
+    engine = CrawlEngine(**engine_options)
+    return asyncio.run(engine.run(seed_url, max_pages, handle_page))
+
+
+_DONE = object()
+
+
+def iter_crawl(seed_url, max_pages, handle_page, buffer_size=32, engine=None, **engine_options):
+    """Crawls in a background thread and yields results as they arrive.
+
+    At most buffer_size results wait in memory: when the consumer falls
+    behind, fetching pauses instead of piling pages up. Pass an engine to
+    read its failed / missing / complete once the results are consumed.
+    """
+    engine = engine or CrawlEngine(**engine_options)
+    buffer = queue.Queue(maxsize=buffer_size)
+    closed = threading.Event()
+
+    def put(item):
+        while not closed.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    async def on_result(result):
+        await asyncio.to_thread(put, result)
+
+    def run():
+        try:
+            asyncio.run(engine.run(seed_url, max_pages, handle_page, on_result=on_result))
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    worker = threading.Thread(target=run, name="crawl-engine", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (or finished): let the crawl thread unwind
+        closed.set()
+        engine.stop()
+        worker.join()
@@ -0,0 +1,38 @@
+from io import BytesIO
+from urllib.parse import urlparse
+
+# Kept apart from Docling/ingest_clean.py so pool workers only import Docling,
+# not Streamlit, fastembed or the Qdrant client. Docling itself is imported
+# on first use: the chat UI imports this module but never converts a page
+# unless a crawl runs.
+
+_converter = None
+
+
+def get_converter():
+    # Building a DocumentConverter loads Docling's pipeline, so share one per process
+    global _converter
+    if _converter is None:
+        from docling.document_converter import DocumentConverter
+
+        _converter = DocumentConverter()
+    return _converter
+
+
+def load_docling_chunks(html, url):
+    """Converts HTML we already fetched, so Docling never downloads url itself."""
+    from docling.datamodel.base_models import DocumentStream
+    from langchain_docling import DoclingLoader
+    from langchain_docling.loader import ExportType
+
+    name = (urlparse(url).path.strip("/").replace("/", "_") or "index") + ".html"
+    stream = DocumentStream(name=name, stream=BytesIO(html.encode("utf-8")))
+    # Wrapped in a list: DoclingLoader treats any iterable (pydantic models
+    # included) as a collection of sources.
+    loader = DoclingLoader(file_path=[stream], converter=get_converter(), export_type=ExportType.DOC_CHUNKS)
+    return loader.lazy_load()
+
+
+def convert_page(html, url):
+    """Process-pool entry point: converts and chunks one page, returning chunk texts."""
+    return [doc.page_content for doc in load_docling_chunks(html, url)]
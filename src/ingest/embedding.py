@@ -0,0 +1,41 @@
+import os
+from collections import deque
+
+import numpy as np
+
+EMBED_BATCH_SIZE = 64
+# fastembed data-parallel workers; None embeds in-process, 0 uses every core
+EMBED_PARALLEL = None
+
+# HYBRID_SEARCH=1 stores BM25 sparse vectors next to the dense ones, so exact
+# product names ("Anuvaad", "iVolve") are matched even when bge-small misses them.
+# The model itself comes from resources.get_sparse_model().
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH") == "1"
+
+
+def embed_chunks(embed_model, chunks, batch_size=EMBED_BATCH_SIZE, parallel=EMBED_PARALLEL, text_key="text"):
+    """Embeds a stream of chunk payloads in batches.
+
+    Yields (payloads, vectors) where vectors is a NumPy array with one row per
+    payload. The input is consumed lazily, so it can be a generator.
+    """
+    pending = deque()
+
+    def texts():
+        for chunk in chunks:
+            pending.append(chunk)
+            yield chunk[text_key]
+
+    # One embed() call for the whole stream lets fastembed keep its batching
+    # and worker pool alive instead of paying the setup cost per chunk.
+    payloads, vectors = [], []
+    for vector in embed_model.embed(texts(), batch_size=batch_size, parallel=parallel):
+        payloads.append(pending.popleft())
+        vectors.append(vector)
+        if len(vectors) == batch_size:
+            yield payloads, np.vstack(vectors)
+            payloads, vectors = [], []
+
+    if vectors:
+        yield payloads, np.vstack(vectors)
+
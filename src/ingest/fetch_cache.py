@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+from .frontier import canonicalize_url
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / ".cache" / "fetch_cache.sqlite3"
+
+CacheEntry = namedtuple("CacheEntry", ["url", "body", "etag", "last_modified", "fetched_at", "final_url"])
+
+
+class FetchCache:
+    """On-disk store of fetched pages keyed by canonical URL.
+
+    Bodies are zlib-compressed; ETag / Last-Modified are kept so the next
+    fetch can be a conditional request.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Crawls call in from a background thread, so guard one shared connection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT, fetched_at REAL, final_url TEXT)"
+        )
+        # Caches written before final_url was recorded replay with the canonical URL as base
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        if "final_url" not in columns:
+            self._conn.execute("ALTER TABLE pages ADD COLUMN final_url TEXT")
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, body, etag, last_modified, fetched_at, final_url FROM pages WHERE url = ?",
+                (canonicalize_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        url, body, etag, last_modified, fetched_at, final_url = row
+        return CacheEntry(url, zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at, final_url)
+
+    def put(self, url, body, etag=None, last_modified=None, final_url=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, fetched_at, final_url) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    canonicalize_url(url), zlib.compress(body.encode("utf-8")), etag, last_modified, time.time(),
+                    final_url,
+                ),
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """Records that a 304 confirmed the cached copy is still current."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), canonicalize_url(url))
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def store_response(cache, url, entry, status_code, body, response_headers, final_url=None):
+    """Updates the cache from one HTTP response and returns the body to use.
+
+    Error responses (status >= 400) are the caller's to handle, never stored.
+    """
+    if status_code == 304 and entry is not None:
+        cache.touch(url)
+        return entry.body
+    if status_code >= 400:
+        raise ValueError(f"{url} answered {status_code}; error pages are not cached")
+    if status_code == 200:
+        cache.put(url, body, response_headers.get("etag"), response_headers.get("last-modified"), final_url)
+    return body
+
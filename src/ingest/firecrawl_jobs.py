@@ -0,0 +1,213 @@
+import json
+import time
+from pathlib import Path
+
+# Firecrawl job IDs of unfinished crawls, keyed by ingest source and start
+# URL, so an interrupted ingestion can pick the same job back up
+DEFAULT_STATE_PATH = Path(__file__).resolve().parents[2] / ".cache" / "firecrawl_jobs.json"
+# Firecrawl keeps crawl results for 24h; older saved jobs are dropped
+JOB_RETENTION = 24 * 3600.0
+
+# Polls start fast and slow down while no new pages arrive
+POLL_INTERVAL = 2.0
+MAX_POLL_INTERVAL = 30.0
+POLL_BACKOFF = 1.6
+CRAWL_TIMEOUT = 900.0
+REQUEST_TIMEOUT = 30.0
+
+
+class CrawlFailed(RuntimeError):
+    pass
+
+
+class CrawlTimeout(TimeoutError):
+    def __init__(self, job_id, timeout):
+        super().__init__(f"Firecrawl job {job_id} still running after {timeout:.0f}s; resume with job_id={job_id!r}")
+        self.job_id = job_id
+
+
+def _field(obj, name, default=None):
+    # The v2 SDK returns pydantic models; fakes and raw API responses are dicts
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def page_from_document(document):
+    """Normalizes one crawled document to {"url", "title", "markdown", "status_code"}."""
+    metadata = _field(document, "metadata") or {}
+    status_code = _field(metadata, "status_code") or _field(metadata, "statusCode")
+    return {
+        "url": _field(metadata, "source_url") or _field(metadata, "sourceURL") or _field(metadata, "url"),
+        "title": _field(metadata, "title"),
+        "markdown": _field(document, "markdown") or "",
+        "status_code": int(status_code) if status_code else None,
+    }
+
+
+class CrawlJobManager:
+    """Starts Firecrawl crawl jobs and streams their pages while they run.
+
+    pages() polls the job status without auto-pagination, walks the `next`
+    links of each response and yields only documents it has not seen yet,
+    so callers can chunk and embed while Firecrawl is still crawling. client
+    is a firecrawl.Firecrawl (or anything with start_crawl /
+    get_crawl_status / get_crawl_status_page). Saved jobs are kept per
+    source, so ingesters crawling the same URL with other settings never
+    resume each other's jobs. sleep, clock and now are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        client,
+        source=None,
+        poll_interval=POLL_INTERVAL,
+        max_poll_interval=MAX_POLL_INTERVAL,
+        backoff=POLL_BACKOFF,
+        timeout=CRAWL_TIMEOUT,
+        request_timeout=REQUEST_TIMEOUT,
+        state_path=DEFAULT_STATE_PATH,
+        sleep=time.sleep,
+        clock=time.monotonic,
+        now=time.time,
+        log=print,
+    ):
+        self.client = client
+        self.source = source
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self.state_path = Path(state_path) if state_path else None
+        self.sleep = sleep
+        self.clock = clock
+        self.now = now
+        self.log = log
+        self.polls = 0
+
+    def start(self, url, limit, formats=("markdown",)):
+        """Starts a crawl of url and returns its job ID (also saved for resume)."""
+        from firecrawl.v2.types import ScrapeOptions
+
+        job = self.client.start_crawl(url, limit=limit, scrape_options=ScrapeOptions(formats=list(formats)))
+        job_id = _field(job, "id")
+        self._save(url, {"job_id": job_id, "limit": limit, "started_at": self.now()})
+        return job_id
+
+    def saved_job(self, url, limit):
+        """Job ID of an unfinished crawl of url with the same limit from an earlier run, or None."""
+        job = self._load().get(self._key(url))
+        if not isinstance(job, dict) or job.get("limit") != limit:
+            return None
+        if self.now() - job.get("started_at", 0) > JOB_RETENTION:
+            self.forget(url)
+            return None
+        return job.get("job_id")
+
+    def resume_or_start(self, url, limit):
+        """(job ID, resumed): the saved job of url if Firecrawl still has it, else a new crawl."""
+        from firecrawl.v2.types import PaginationConfig
+
+        job_id = self.saved_job(url, limit)
+        if job_id:
+            try:
+                status = self.client.get_crawl_status(
+                    job_id,
+                    pagination_config=PaginationConfig(auto_paginate=False),
+                    request_timeout=self.request_timeout,
+                )
+                if _field(status, "status") not in ("failed", "cancelled"):
+                    return job_id, True
+                self.log(f"⚠️ Saved crawl job {job_id} {_field(status, 'status')}; starting a new crawl")
+            except Exception as e:
+                # Expired or unknown on Firecrawl's side: resuming would fail the same way every run
+                self.log(f"⚠️ Saved crawl job {job_id} is gone ({e}); starting a new crawl")
+            self.forget(url)
+        return self.start(url, limit), False
+
+    def forget(self, url):
+        self._save(url, None)
+
+    def pages(self, job_id, skip_urls=()):
+        """Yields normalized pages of job_id as soon as Firecrawl reports them.
+
+        Stops once the job completed and every page was consumed; raises
+        CrawlFailed if it failed or was cancelled and CrawlTimeout after
+        self.timeout seconds (the job keeps running on Firecrawl's side).
+        """
+        from firecrawl.v2.types import PaginationConfig
+
+        seen = set(skip_urls)
+        consumed = 0
+        interval = self.poll_interval
+        deadline = self.clock() + self.timeout
+        while True:
+            self.polls += 1
+            status = self.client.get_crawl_status(
+                job_id,
+                pagination_config=PaginationConfig(auto_paginate=False),
+                request_timeout=self.request_timeout,
+            )
+            state = _field(status, "status")
+            if state in ("failed", "cancelled"):
+                raise CrawlFailed(f"Firecrawl job {job_id} {state}: {_field(status, 'warning') or 'no details'}")
+
+            # Documents come back in crawl order; skip the ones earlier polls yielded
+            position, new = 0, 0
+            response = status
+            while True:
+                documents = _field(response, "data") or []
+                for document in documents[max(consumed - position, 0):]:
+                    page = page_from_document(document)
+                    consumed += 1
+                    if not page["url"] or page["url"] in seen:
+                        continue
+                    seen.add(page["url"])
+                    new += 1
+                    yield page
+                position += len(documents)
+                next_url = _field(response, "next")
+                if not next_url:
+                    break
+                response = self.client.get_crawl_status_page(next_url, request_timeout=self.request_timeout)
+
+            self.log(
+                f"⏳ Status: {state} | Progress: {_field(status, 'completed', 0)}/{_field(status, 'total', 0)} pages"
+                f" | {new} new"
+            )
+            if state == "completed":
+                return
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                raise CrawlTimeout(job_id, self.timeout)
+            # Poll quickly while pages stream in, back off while the crawl is quiet
+            interval = self.poll_interval if new else min(interval * self.backoff, self.max_poll_interval)
+            self.sleep(min(interval, remaining))
+
+    def _load(self):
+        if self.state_path is None or not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return {}
+
+    def _key(self, url):
+        return f"{self.source}:{url}" if self.source else url
+
+    def _save(self, url, job):
+        if self.state_path is None:
+            return
+        # Entries Firecrawl no longer has (or from before limits were saved) go too
+        jobs = {
+            key: saved for key, saved in self._load().items()
+            if isinstance(saved, dict) and self.now() - saved.get("started_at", 0) <= JOB_RETENTION
+        }
+        if job:
+            jobs[self._key(url)] = job
+        else:
+            jobs.pop(self._key(url), None)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(jobs, indent=2), encoding="utf-8")
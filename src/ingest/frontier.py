@@ -0,0 +1,77 @@
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query params that only identify the referrer, never the page content
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "mc_cid", "mc_eid", "_ga", "_gl", "ref", "ref_src"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """Normalizes a URL so trivially different spellings dedupe to one key."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(k)
+    )
+
+    # Fragments never reach the server, so they are always dropped
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class Frontier:
+    """FIFO crawl frontier that dedupes canonical URLs when they are enqueued.
+
+    Set limit to stop admitting new URLs once that many have been accepted;
+    dropped counts the new URLs it turned away.
+    """
+
+    def __init__(self, seeds=(), limit=None):
+        self.limit = limit
+        self.dropped = 0
+        self._queue = deque()
+        self._seen = set()
+        for url in seeds:
+            self.add(url)
+
+    def add(self, url):
+        """Queues url unless it (or an equivalent spelling) was seen before."""
+        canonical = canonicalize_url(url)
+        if canonical in self._seen:
+            return False
+        if self.limit is not None and len(self._seen) >= self.limit:
+            self.dropped += 1
+            return False
+        self._seen.add(canonical)
+        self._queue.append(canonical)
+        return True
+
+    def pop(self):
+        return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self._seen
+
+    @property
+    def seen_count(self):
+        return len(self._seen)
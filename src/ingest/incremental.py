@@ -0,0 +1,152 @@
+import hashlib
+import uuid
+
+from qdrant_client import models
+
+from .chunking import CHUNKER_VERSION
+from .frontier import canonicalize_url
+from .payload_fields import SOURCE_FIELD
+
+# Statuses that mean a page was removed, not that the fetch went wrong
+GONE_STATUSES = (404, 410)
+
+
+def content_hash(text):
+    # Salted with the chunker version so a chunking change re-embeds every page
+    return hashlib.sha256(f"{CHUNKER_VERSION}\n{text}".encode("utf-8")).hexdigest()
+
+
+def point_id(url, chunk_index, source=None):
+    """Stable point ID so re-ingesting a page overwrites its old points.
+
+    With a source, two ingesters writing the same page get separate points.
+    """
+    key = f"{canonicalize_url(url)}#{chunk_index}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}:{key}" if source else key))
+
+
+def chunk_point_id(payload, index):
+    """make_id callback for ingest_chunks; needs source_url, chunk_index and optionally ingest_source."""
+    return point_id(payload["source_url"], payload["chunk_index"], payload.get(SOURCE_FIELD))
+
+
+def _source_filter(source):
+    return models.FieldCondition(key=SOURCE_FIELD, match=models.MatchValue(value=source))
+
+
+def _url_filter(urls, source=None):
+    must = [models.FieldCondition(key="source_url", match=models.MatchAny(any=list(urls)))]
+    if source is None:
+        return models.Filter(must=must)
+    return models.Filter(must=must + [_source_filter(source)])
+
+
+class IncrementalIndex:
+    """Tracks which pages changed since the last ingest of a collection.
+
+    Call check() for every page the crawl sees and finish() once it is done;
+    pages that were indexed before but not seen this run are deleted. Chunks
+    should carry their page's chunk_count: a page with fewer points than
+    that (a run died between its upserts) counts as changed.
+
+    Collections shared by several ingesters need a source: the index then
+    only sees, replaces and deletes points whose ingest_source payload field
+    is that source, so one ingester's run leaves the others' pages alone.
+    Points written before sources existed are replaced when their page is
+    re-ingested, but never deleted as gone.
+    """
+
+    def __init__(self, client, collection_name, source=None):
+        self.client = client
+        self.collection_name = collection_name
+        self.source = source
+        # Pages with points that predate ingest_source (only tracked with a source)
+        self.legacy = set()
+        self.known = self._load_hashes()
+        self.seen = set()
+        self.unchanged = 0
+        self.changed = 0
+
+    def _load_hashes(self):
+        if not self.client.collection_exists(self.collection_name):
+            return {}
+
+        hashes, stored, expected = {}, {}, {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=["source_url", "content_hash", "chunk_count", SOURCE_FIELD],
+                with_vectors=False,
+            )
+            for point in points:
+                payload = point.payload or {}
+                url = payload.get("source_url")
+                if not url:
+                    continue
+                source = payload.get(SOURCE_FIELD)
+                if source == self.source or self.source is None:
+                    digest = payload.get("content_hash")
+                    # Mixed hashes can only come from an interrupted re-embed
+                    hashes[url] = digest if hashes.get(url, digest) == digest else None
+                    stored[url] = stored.get(url, 0) + 1
+                    if payload.get("chunk_count") is not None:
+                        expected[url] = payload["chunk_count"]
+                elif source is None:
+                    self.legacy.add(url)
+            if offset is None:
+                break
+
+        # Points from before chunk_count existed are taken as complete
+        partial = [url for url, count in expected.items() if stored[url] != count]
+        for url in partial:
+            hashes[url] = None
+        if partial:
+            print(f"🩹 {len(partial)} partially written pages will be re-embedded.")
+        return hashes
+
+    def check(self, url, text):
+        """Returns the page's content hash if it needs (re-)embedding, else None."""
+        digest = content_hash(text)
+        self.seen.add(url)
+        previous = self.known.get(url)
+        if previous == digest:
+            self.unchanged += 1
+            return None
+
+        if url in self.known:
+            # The new version may have fewer chunks; drop every old one first
+            self.client.delete(collection_name=self.collection_name, points_selector=_url_filter([url], self.source))
+        if url in self.legacy:
+            # Points from before ingest_source existed were keyed without it
+            self.legacy.discard(url)
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.Filter(
+                    must=[
+                        models.FieldCondition(key="source_url", match=models.MatchValue(value=url)),
+                        models.IsEmptyCondition(is_empty=models.PayloadField(key=SOURCE_FIELD)),
+                    ]
+                ),
+            )
+        self.changed += 1
+        return digest
+
+    def finish(self, complete=True, missing=()):
+        """Deletes points of pages that disappeared and returns how many pages that was.
+
+        Pass complete=False when the crawl may have missed pages that still
+        exist (fetch errors, a page limit, a run stopped early); then only
+        the pages in missing, which answered 404 / 410, are deleted.
+        """
+        unseen = set(self.known) - self.seen
+        gone = unseen if complete else unseen & set(missing)
+        if gone:
+            self.client.delete(collection_name=self.collection_name, points_selector=_url_filter(gone, self.source))
+        kept = f", {len(unseen) - len(gone)} unseen kept (incomplete crawl)" if len(unseen) > len(gone) else ""
+        print(
+            f"♻️ Incremental sync: {self.changed} changed, {self.unchanged} unchanged, {len(gone)} removed{kept}."
+        )
+        return len(gone)
@@ -1,66 +1,124 @@
-import os
-import time
-import uuid
-from firecrawl import Firecrawl
-from qdrant_client import QdrantClient, models
-from fastembed import TextEmbedding
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Module path setup for internal imports
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from ingest.aliases import ingest_target
+    from ingest.chunking import Chunker
+    from ingest.embedding import HYBRID_SEARCH
+    from ingest.firecrawl_jobs import CrawlFailed, CrawlJobManager, CrawlTimeout
+    from ingest.incremental import GONE_STATUSES, IncrementalIndex, chunk_point_id
+    from ingest.pipeline import ingest_chunks
+    from resources import get_embed_model, get_firecrawl_client, get_qdrant_client, get_sparse_model
+    from retrieval.versioning import bump_collection_version
+    from tracing import span, traced
+else:
+    from .aliases import ingest_target
+    from .chunking import Chunker
+    from .embedding import HYBRID_SEARCH
+    from .firecrawl_jobs import CrawlFailed, CrawlJobManager, CrawlTimeout
+    from .incremental import GONE_STATUSES, IncrementalIndex, chunk_point_id
+    from .pipeline import ingest_chunks
+    from ..resources import get_embed_model, get_firecrawl_client, get_qdrant_client, get_sparse_model
+    from ..retrieval.versioning import bump_collection_version
+    from ..tracing import span, traced
+
 load_dotenv()
 
-app = Firecrawl(api_key=os.getenv("FIRECRAWL_API_KEY"))
-client_db = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
-embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
 COLLECTION_NAME = "tarento_web_data"
+# The root ingest_data.py and Docling/ingest_clean.py write here too
+INGEST_SOURCE = "firecrawl_clean"
+CRAWL_LIMIT = 30
+
+@traced("ingest", source="firecrawl")
+def run_deep_ingestion(start_url="https://www.tarento.com", rebuild=False, job_id=None, firecrawl=None):
+    """Crawls start_url with Firecrawl and ingests pages while the crawl runs.
+
+    job_id resumes an existing crawl job; by default an unfinished job from
+    an earlier run of the same start_url and CRAWL_LIMIT is picked up again
+    while Firecrawl still has it.
+    """
+    client_db = get_qdrant_client()
+    embed_model = get_embed_model()
+    sparse_model = get_sparse_model() if HYBRID_SEARCH else None
+    chunker = Chunker()
+
+    # 1. Start (or resume) the job
+    jobs = CrawlJobManager(firecrawl or get_firecrawl_client(), source=INGEST_SOURCE)
+    if not job_id:
+        job_id, resumed = jobs.resume_or_start(start_url, limit=CRAWL_LIMIT)
+        if resumed:
+            print(f"🔁 Resuming crawl job {job_id}")
+
+    # 2. Processing with Heading/Paragraph-Aware Chunking (unchanged pages are skipped)
+    # as pages arrive. rebuild=True fills a new collection and switches the alias once it is done.
+    try:
+        with ingest_target(
+            client_db, COLLECTION_NAME, rebuild=rebuild, hybrid=HYBRID_SEARCH, source=INGEST_SOURCE
+        ) as target:
+            index = IncrementalIndex(client_db, target.collection_name, source=INGEST_SOURCE)
+            crawled, missing, failed = 0, set(), set()
+
+            def iter_chunks():
+                nonlocal crawled
+                for page in jobs.pages(job_id):
+                    crawled += 1
+                    markdown_text = page["markdown"]
+                    actual_url = page["url"] or start_url
+                    if page["status_code"] and page["status_code"] >= 400:
+                        # Error pages are not content; only 404 / 410 mean the page is gone
+                        (missing if page["status_code"] in GONE_STATUSES else failed).add(actual_url)
+                        print(f"⚠️ Skipping {actual_url}: HTTP {page['status_code']}")
+                        continue
+                    title = page["title"] or "Tarento Solution"
 
-def run_deep_ingestion(start_url="https://www.tarento.com"):
-    # 1. Start Job
-    crawl_job = app.start_crawl(
-        url=start_url,
-        params={
-            "limit": 30,
-            "scrapeOptions": {"formats": ["markdown"]},
-        },
-    )
-    job_id = crawl_job["id"]
-    
-    # 2. Polling for results
-    while True:
-        status_data = app.get_crawl_status(job_id)
-        if status_data.get("status") == "completed":
-            crawl_result = status_data.get("data", [])
-            break
-        time.sleep(5)
+                    digest = index.check(actual_url, markdown_text)
+                    if not digest:
+                        continue
 
-    # 3. Processing with Paragraph-Aware Chunking
-    points = []
-    for page in crawl_result:
-        markdown_text = page.get("markdown", "")
-        metadata = page.get("metadata", {})
-        actual_url = metadata.get("sourceURL") or metadata.get("url")
-        title = metadata.get("title") or "Tarento Solution"
+                    # Drop the contact banner, then pack paragraphs up to the token budget
+                    paragraphs = [p for p in markdown_text.split("\n\n") if "SAY HELLO" not in p]
+                    with span("ingest.chunk"):
+                        chunks = chunker.split("\n\n".join(paragraphs))
+                    for chunk_index, chunk in enumerate(chunks):
+                        yield {
+                            "text": chunk,
+                            "source_url": actual_url,
+                            "title": title,
+                            "content_hash": digest,
+                            "chunk_index": chunk_index,
+                            "chunk_count": len(chunks),
+                            "ingest_source": INGEST_SOURCE,
+                        }
 
-        # Split by double newline to preserve paragraph context
-        paragraphs = markdown_text.split("\n\n")
-        for chunk in paragraphs:
-            if len(chunk) < 60 or "SAY HELLO" in chunk: # Filter noise
-                continue
-            
-            vector = list(embed_model.embed([chunk]))[0].tolist()
-            points.append(
-                models.PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload={
-                        "text": chunk,
-                        "source_url": actual_url,
-                        "title": title,
-                    },
-                )
+            total = target.points = ingest_chunks(
+                client_db,
+                embed_model,
+                target.collection_name,
+                iter_chunks(),
+                make_id=chunk_point_id,
+                sparse_model=sparse_model,
             )
+            with span("ingest.finish"):
+                # At the page limit Firecrawl may have left pages out; they are kept
+                complete = not failed and crawled < CRAWL_LIMIT
+                removed = index.finish(complete=complete, missing=missing)
+    except CrawlTimeout as e:
+        # The job keeps running on Firecrawl; the next run resumes it
+        print(f"⏱️ {e}")
+        return 0
+    except CrawlFailed as e:
+        jobs.forget(start_url)
+        print(f"❌ {e}")
+        return 0
+    jobs.forget(start_url)
 
-    client_db.upsert(collection_name=COLLECTION_NAME, points=points)
-    print(f"✅ Ingested {len(points)} high-quality chunks.")
+    if total or removed:
+        bump_collection_version(client_db, COLLECTION_NAME)
+    print(f"✅ Ingested {total} high-quality chunks.")
+    return total
 
 if __name__ == "__main__":
     run_deep_ingestion()
\ No newline at end of file
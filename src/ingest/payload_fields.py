@@ -0,0 +1,54 @@
+from urllib.parse import unquote, urlparse
+
+# First path segment -> coarse page type, so searches can be scoped or skip noise
+SECTION_CONTENT_TYPES = {
+    "case-studies": "case_study",
+    "case-study": "case_study",
+    "services": "service",
+    "solutions": "service",
+    "products": "product",
+    "blog": "article",
+    "blogs": "article",
+    "insights": "article",
+    "news": "article",
+    "about": "about",
+    "about-us": "about",
+    "careers": "careers",
+    "jobs": "careers",
+    "contact": "contact",
+    "contact-us": "contact",
+    "say-hello": "contact",
+    "privacy": "legal",
+    "privacy-policy": "legal",
+    "terms": "legal",
+    "terms-of-use": "legal",
+    "cookie-policy": "legal",
+    "sitemap": "legal",
+}
+# Which ingester wrote a point, for collections several ingesters share
+SOURCE_FIELD = "ingest_source"
+# Payload fields that get a keyword index (see pipeline.ensure_collection)
+INDEXED_FIELDS = ("source_url", "section", "content_type", "path_segments", "path_prefixes", SOURCE_FIELD)
+
+
+def path_segments(path):
+    return [unquote(part).lower() for part in path.split("/") if part]
+
+
+def path_prefixes(path):
+    """Every leading part of path: "/case-studies/anuvaad" -> ["case-studies", "case-studies/anuvaad"]."""
+    segments = path_segments(path)
+    return ["/".join(segments[:depth]) for depth in range(1, len(segments) + 1)]
+
+
+def url_fields(url):
+    """Derives path_segments, path_prefixes, section and content_type from a page URL."""
+    path = urlparse(url).path
+    segments = path_segments(path)
+    section = segments[0] if segments else "home"
+    return {
+        "path_segments": segments,
+        "path_prefixes": path_prefixes(path),
+        "section": section,
+        "content_type": SECTION_CONTENT_TYPES.get(section, "page") if segments else "home",
+    }
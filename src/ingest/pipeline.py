@@ -0,0 +1,161 @@
+import os
+import uuid
+
+from qdrant_client import models
+
+from .embedding import EMBED_PARALLEL, embed_chunks
+from .payload_fields import INDEXED_FIELDS, url_fields
+
+try:
+    from ..tracing import span, start_trace, timed_iter
+except ImportError:
+    # Imported as ingest.pipeline with src/ on sys.path
+    from tracing import span, start_trace, timed_iter
+
+UPSERT_BATCH_SIZE = 64
+# Named vectors of a hybrid collection (see HYBRID_SEARCH in embedding.py)
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "bm25"
+
+# Storage options applied when a collection is created. With quantization the
+# compact int8/binary copies stay in RAM for search and the float32 originals
+# (optionally on disk) are only read to rescore the best candidates.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION") or None  # "scalar" or "binary"
+VECTORS_ON_DISK = os.getenv("VECTORS_ON_DISK") == "1"
+HNSW_M = int(os.getenv("HNSW_M", 0)) or None  # Qdrant default: 16
+HNSW_EF_CONSTRUCT = int(os.getenv("HNSW_EF_CONSTRUCT", 0)) or None  # Qdrant default: 100
+
+
+def quantization_config(kind):
+    """Qdrant quantization config for kind = None, "scalar" (int8) or "binary"."""
+    if kind is None:
+        return None
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Unknown VECTOR_QUANTIZATION {kind!r}; expected 'scalar' or 'binary'.")
+
+
+def ensure_collection(
+    client,
+    collection_name,
+    vector_size=384,
+    hybrid=False,
+    quantization=VECTOR_QUANTIZATION,
+    on_disk=VECTORS_ON_DISK,
+    hnsw_m=HNSW_M,
+    hnsw_ef_construct=HNSW_EF_CONSTRUCT,
+):
+    """Creates the collection if it is missing; returns True when it was created.
+
+    hybrid=True creates named "dense" + "bm25" (sparse, IDF-weighted) vectors
+    instead of a single unnamed dense vector. Storage options only apply to
+    new collections; an existing one keeps the settings it was created with.
+    """
+    if client.collection_exists(collection_name):
+        info = client.get_collection(collection_name)
+        existing = bool(info.config.params.sparse_vectors)
+        if existing != hybrid:
+            raise ValueError(
+                f"Collection {collection_name!r} was created {'with' if existing else 'without'} sparse "
+                f"vectors but HYBRID_SEARCH is {'off' if existing else 'on'}; delete it and re-ingest."
+            )
+        _ensure_payload_indexes(client, collection_name, info.payload_schema or {})
+        return False
+
+    dense = models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=on_disk or None)
+    hnsw = models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct) if hnsw_m or hnsw_ef_construct else None
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={DENSE_VECTOR: dense} if hybrid else dense,
+        sparse_vectors_config=(
+            # BM25 term weights only make sense with collection-wide IDF
+            {SPARSE_VECTOR: models.SparseVectorParams(modifier=models.Modifier.IDF)} if hybrid else None
+        ),
+        hnsw_config=hnsw,
+        quantization_config=quantization_config(quantization),
+    )
+    _ensure_payload_indexes(client, collection_name, {})
+    return True
+
+
+def _ensure_payload_indexes(client, collection_name, existing):
+    # Incremental sync deletes by source_url; searches filter by section and type
+    for field in INDEXED_FIELDS:
+        if field not in existing:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+
+
+def random_point_id(payload, index):
+    return str(uuid.uuid4())
+
+
+def sparse_vector(embedding):
+    """fastembed SparseEmbedding -> Qdrant SparseVector."""
+    return models.SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
+
+
+def _hybrid_vectors(sparse_model, payloads, dense_vectors, batch_size):
+    sparse = sparse_model.embed([payload["text"] for payload in payloads], batch_size=batch_size)
+    # Sparse vectors are not NumPy rows, so upload_collection cannot convert the dense matrix
+    # itself; convert it in one call, as it does for dense-only batches, not row by row
+    return [
+        {DENSE_VECTOR: dense, SPARSE_VECTOR: sparse_vector(embedding)}
+        for dense, embedding in zip(dense_vectors.tolist(), sparse)
+    ]
+
+
+def ingest_chunks(
+    client,
+    embed_model,
+    collection_name,
+    chunks,
+    make_id=random_point_id,
+    batch_size=UPSERT_BATCH_SIZE,
+    parallel=EMBED_PARALLEL,
+    wait=False,
+    sparse_model=None,
+):
+    """Runs the embed -> upsert tail of the pipeline and returns the point count.
+
+    chunks is a (lazy) stream of payload dicts with a "text" key. Each batch is
+    upserted as soon as it is embedded and then dropped, so memory stays flat
+    however many chunks flow through. make_id(payload, index) picks point IDs.
+    With a sparse_model the collection must be hybrid (see ensure_collection).
+    Payloads with a source_url get section/content_type/path_segments/path_prefixes added.
+    With TRACING=1 the run is traced: ingest.source is time spent waiting on
+    chunks (crawling, converting, chunking), then embed, sparse and upsert.
+    """
+    total = 0
+    with start_trace("ingest", collection=collection_name) as trace:
+        # Spans nest, so source time is not counted again as embedding time
+        chunks = timed_iter(chunks, "ingest.source")
+        batches = embed_chunks(embed_model, chunks, batch_size=batch_size, parallel=parallel)
+        for payloads, vectors in timed_iter(batches, "ingest.embed"):
+            for payload in payloads:
+                if "source_url" in payload and "section" not in payload:
+                    payload.update(url_fields(payload["source_url"]))
+            if sparse_model is not None:
+                with span("ingest.sparse"):
+                    vectors = _hybrid_vectors(sparse_model, payloads, vectors, batch_size)
+            ids = [make_id(payload, total + i) for i, payload in enumerate(payloads)]
+            with span("ingest.upsert"):
+                client.upload_collection(
+                    collection_name=collection_name,
+                    vectors=vectors,
+                    payload=payloads,
+                    ids=ids,
+                    batch_size=batch_size,
+                    wait=wait,
+                )
+            total += len(payloads)
+        if trace is not None:
+            trace.attrs["points"] = total
+    return total
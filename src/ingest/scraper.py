@@ -1,12 +1,36 @@
 import os
-import uuid
-import requests
+import re
+import sys
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-from qdrant_client import QdrantClient, models
-from fastembed import TextEmbedding
 from dotenv import load_dotenv
 
+# Module path setup for internal imports
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from ingest.aliases import ingest_target
+    from ingest.chunking import Chunker
+    from ingest.crawler import CrawlEngine, iter_crawl
+    from ingest.embedding import HYBRID_SEARCH
+    from ingest.fetch_cache import FetchCache
+    from ingest.incremental import IncrementalIndex, chunk_point_id
+    from ingest.pipeline import ingest_chunks
+    from resources import get_embed_model, get_qdrant_client, get_sparse_model
+    from retrieval.versioning import bump_collection_version
+    from tracing import span, traced
+else:
+    from .aliases import ingest_target
+    from .chunking import Chunker
+    from .crawler import CrawlEngine, iter_crawl
+    from .embedding import HYBRID_SEARCH
+    from .fetch_cache import FetchCache
+    from .incremental import IncrementalIndex, chunk_point_id
+    from .pipeline import ingest_chunks
+    from ..resources import get_embed_model, get_qdrant_client, get_sparse_model
+    from ..retrieval.versioning import bump_collection_version
+    from ..tracing import span, traced
+
 # 1. Environment Setup
 load_dotenv()
 QDRANT_URL = os.getenv("QDRANT_URL")
@@ -17,92 +41,147 @@ if not QDRANT_URL:
     print("❌ ERROR: QDRANT_URL not found in .env file!")
     exit()
 
-# 2. Initializing Clients
-print("⚙️ Initializing clients...")
-client_db = QdrantClient(
-    url=QDRANT_URL, 
-    api_key=QDRANT_API_KEY,
-    prefer_grpc=False  # Optimized for your GCP Cloud Cluster
-)
-embed_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-
 BASE_URL = "https://www.tarento.com"
 MAX_PAGES = 40 
 
+# Crawl engine tuning: tarento.com is a single host, so the per-host limit
+# is what actually bounds parallelism; raise POLITENESS_DELAY to slow down.
+MAX_CONCURRENCY = 16
+PER_HOST_CONCURRENCY = 12
+POLITENESS_DELAY = 0.0
+
+# Incremental mode only re-embeds pages whose text changed since the last run;
+# set to False to rebuild from scratch into a new collection behind the alias.
+INCREMENTAL = True
+
+# Fetched HTML is kept in an on-disk cache and revalidated with ETag /
+# Last-Modified. OFFLINE_REPLAY=1 re-ingests from that cache only.
+USE_FETCH_CACHE = True
+OFFLINE_REPLAY = os.getenv("OFFLINE_REPLAY") == "1"
+
+# Elements that start a new paragraph; everything else is inline text
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "li", "ul", "ol", "table", "tr", "blockquote", "pre", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+]
+
 def is_internal(url):
     return urlparse(url).netloc == urlparse(BASE_URL).netloc
 
-def run_local_recursive_crawl():
-    to_visit = [BASE_URL]
-    visited = set()
-    points = []
-
-    print(f"🚀 Starting BFS discovery crawl from {BASE_URL}...")
-
-    # The BFS Loop
-    while to_visit and len(visited) < MAX_PAGES:
-        current_url = to_visit.pop(0)
-        if current_url in visited:
-            continue
-        
-        visited.add(current_url)
-        print(f"🔍 Scraping ({len(visited)}/{MAX_PAGES}): {current_url}")
-
-        try:
-            response = requests.get(current_url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Discovery: Find internal links for the next "level" of BFS
-            for a_tag in soup.find_all('a', href=True):
-                full_link = urljoin(BASE_URL, a_tag['href']).split('#')[0].rstrip('/')
-                if is_internal(full_link) and full_link not in visited:
-                    to_visit.append(full_link)
-
-
-            # Physically remove the elements that cause hallucinated links
-            for noise in soup(['header', 'footer', 'nav', 'script', 'style', 'aside']):
-                noise.decompose()
-
-            main_body = soup.find('main') or soup.find('article') or soup.find('body')
-            clean_text = main_body.get_text(separator=' ', strip=True)
-
-            if len(clean_text) > 300:
-                # Generate embedding
-                vector = list(embed_model.embed([clean_text]))[0].tolist()
-                points.append(models.PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload={
-                        "text": clean_text, 
-                        "source_url": current_url,
-                        "title": soup.title.string if soup.title else "Tarento Page"
+def block_text(element):
+    """Text of element with blank lines between blocks and "#"-marked headings.
+
+    The chunker splits on those boundaries; flattening the page into one line
+    would leave it nothing but sentence punctuation to go by.
+    """
+    for heading in element.find_all(re.compile(r"^h[1-6]$")):
+        heading.insert(0, "#" * int(heading.name[1]) + " ")
+    for block in element.find_all(BLOCK_TAGS):
+        block.insert_before("\n\n")
+        block.insert_after("\n\n")
+    blocks = (" ".join(block.split()) for block in re.split(r"\n\s*\n", element.get_text(" ")))
+    return "\n\n".join(block for block in blocks if block)
+
+def extract_page(current_url, html, base_url=None):
+    """Parses one fetched page into (internal links, payload or None).
+
+    Links resolve against base_url, the URL the page was served from.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Discovery: Find internal links for the next "level" of BFS
+    links = []
+    for a_tag in soup.find_all('a', href=True):
+        # The crawl frontier canonicalizes and dedupes, so raw links are fine here
+        full_link = urljoin(base_url or current_url, a_tag['href'])
+        if is_internal(full_link):
+            links.append(full_link)
+
+    # Physically remove the elements that cause hallucinated links
+    for noise in soup(['header', 'footer', 'nav', 'script', 'style', 'aside']):
+        noise.decompose()
+
+    main_body = soup.find('main') or soup.find('article') or soup.find('body')
+    clean_text = block_text(main_body) if main_body else ""
+
+    if len(clean_text) <= 300:
+        return links, None
+
+    return links, {
+        "text": clean_text, 
+        "source_url": current_url,
+        "title": soup.title.string if soup.title else "Tarento Page"
+    }
+
+@traced("ingest", source="scraper")
+def run_local_recursive_crawl(incremental=INCREMENTAL):
+    # 2. Initializing Clients (shared through the resource registry, built on first use)
+    print("⚙️ Initializing clients...")
+    client_db = get_qdrant_client(QDRANT_URL, QDRANT_API_KEY, prefer_grpc=False)  # Optimized for your GCP Cloud Cluster
+    embed_model = get_embed_model()
+    sparse_model = get_sparse_model() if HYBRID_SEARCH else None
+    chunker = Chunker()
+
+    # 3. Preparing Qdrant Cloud (pages are upserted while the crawl runs). A full
+    # rebuild fills a new collection behind the COLLECTION_NAME alias, so the
+    # chatbot keeps answering from the old data until the switch.
+    with ingest_target(client_db, COLLECTION_NAME, rebuild=not incremental, hybrid=HYBRID_SEARCH) as target:
+        index = IncrementalIndex(client_db, target.collection_name)
+
+        if OFFLINE_REPLAY:
+            print(f"📼 Replaying crawl of {BASE_URL} from the fetch cache...")
+        else:
+            print(f"🚀 Starting BFS discovery crawl from {BASE_URL}...")
+
+        cache = FetchCache() if USE_FETCH_CACHE or OFFLINE_REPLAY else None
+        engine = CrawlEngine(
+            max_concurrency=MAX_CONCURRENCY,
+            per_host_concurrency=PER_HOST_CONCURRENCY,
+            politeness_delay=POLITENESS_DELAY,
+            cache=cache,
+            offline=OFFLINE_REPLAY,
+        )
+        pages = iter_crawl(BASE_URL, MAX_PAGES, extract_page, engine=engine)
+
+        def changed_pages():
+            for page in pages:
+                digest = index.check(page["source_url"], page["text"])
+                if not digest:
+                    continue
+                # One vector per page would be truncated at bge-small's 512 tokens
+                with span("ingest.chunk"):
+                    chunks = chunker.split(page["text"])
+                for chunk_index, chunk in enumerate(chunks):
+                    yield {
+                        **page,
+                        "text": chunk,
+                        "content_hash": digest,
+                        "chunk_index": chunk_index,
+                        "chunk_count": len(chunks),
                     }
-                ))
-        except Exception as e:
-            print(f"⚠️ Error on {current_url}: {e}")
-
-    # 3. Updating Qdrant Cloud
-    print(f"📡 Found {len(points)} quality pages. Updating Qdrant...")
-
-    try:
-        client_db.delete_collection(collection_name=COLLECTION_NAME)
-        print("🗑️ Old collection cleared.")
-    except Exception:
-        print("ℹ️ Starting with a fresh collection.")
-
-    client_db.create_collection(
-        collection_name=COLLECTION_NAME,
-        vectors_config=models.VectorParams(
-            size=384, 
-            distance=models.Distance.COSINE
+
+        # fetch -> clean -> embed -> upsert, one bounded batch at a time
+        total = target.points = ingest_chunks(
+            client_db,
+            embed_model,
+            target.collection_name,
+            changed_pages(),
+            make_id=chunk_point_id,
+            sparse_model=sparse_model,
         )
-    )
+        with span("ingest.finish"):
+            # A failed fetch or the MAX_PAGES cut is no evidence a page was removed
+            removed = index.finish(complete=engine.complete, missing=engine.missing)
+
+    if total or removed:
+        # Tells the chat apps to drop cached search results
+        bump_collection_version(client_db, COLLECTION_NAME)
 
-    if points:
-        client_db.upsert(collection_name=COLLECTION_NAME, points=points)
-        print(f"✅ Success! {len(points)} clean pages are now in the cloud.")
+    if total or index.unchanged:
+        print(f"✅ Success! {total} chunks from {index.changed} changed pages uploaded, {index.unchanged} already up to date.")
     else:
         print("❌ No valid content found to upload.")
+    return total
 
 if __name__ == "__main__":
     run_local_recursive_crawl()
\ No newline at end of file
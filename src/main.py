@@ -2,8 +2,6 @@ import json
 import os
 import re
 import streamlit as st
-from qdrant_client import QdrantClient
-from fastembed import TextEmbedding
 from dotenv import load_dotenv
 import sys
 from pathlib import Path
@@ -15,56 +13,145 @@ if "messages" not in st.session_state:
 # Module path setup for internal imports
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[1]))
-    from agent.gemini import get_assistant_response
+    from agent.answer_cache import chunk_ids_for
+    from agent.context import format_report, pack_context, trim_history
+    from agent.gemini import get_assistant_response, stream_assistant_response
+    from agent.streaming import SourceLinkFilter
+    from retrieval.cache import RetrievalCache
+    from resources import get_embed_model, get_qdrant_client, get_reranker, get_sparse_model, warm_up
+    from retrieval.multi_query import format_timings, multi_query_search
+    from retrieval.search import (
+        NOISE_CONTENT_TYPES,
+        apply_score_threshold,
+        build_filter,
+        is_hybrid_collection,
+        search_collection,
+    )
+    from tracing import TRACING, span, stage_rows, start_trace
 else:
-    from .agent.gemini import get_assistant_response
+    from .agent.answer_cache import chunk_ids_for
+    from .agent.context import format_report, pack_context, trim_history
+    from .agent.gemini import get_assistant_response, stream_assistant_response
+    from .agent.streaming import SourceLinkFilter
+    from .retrieval.cache import RetrievalCache
+    from .resources import get_embed_model, get_qdrant_client, get_reranker, get_sparse_model, warm_up
+    from .retrieval.multi_query import format_timings, multi_query_search
+    from .retrieval.search import (
+        NOISE_CONTENT_TYPES,
+        apply_score_threshold,
+        build_filter,
+        is_hybrid_collection,
+        search_collection,
+    )
+    from .tracing import TRACING, span, stage_rows, start_trace
 
 # --- 2. CONFIGURATION & CLIENTS ---
 load_dotenv()
 st.set_page_config(page_title="Tarento AI", page_icon="⚙️", layout="centered")
 
+# Render tokens as Groq produces them; set STREAM_RESPONSES=0 to wait for the full answer
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") != "0"
+
+# Retrieval settings; compare alternatives with benchmarks/retrieval_bench.py
+SEARCH_LIMIT = 3
+CONTEXT_SCORE_THRESHOLD = 0.45  # best hit must clear this for any context to be used
+LINK_SCORE_THRESHOLD = 0.60  # best hit must clear this for the source link to be shown
+# Search with the raw, history-condensed and keyword variants of each question
+# in one batch, then rerank with a local cross-encoder (RERANK=0 skips it)
+MULTI_QUERY = os.getenv("MULTI_QUERY", "1") != "0"
+RERANK = os.getenv("RERANK", "1") != "0"
+
+COLLECTION_NAME = "tarento_knowledge"
+
+# Using REST (HTTP) for better Cloud stability
+client_db = get_qdrant_client(prefer_grpc=False)
+# Models load in the background while the page renders; a search that comes
+# in first waits for the same load instead of starting another one.
+warm_up(get_embed_model, get_reranker if MULTI_QUERY and RERANK else None)
+
 @st.cache_resource
-def initialize_system():
-    # Using REST (HTTP) for better Cloud stability
-    client = QdrantClient(
-        url=os.getenv("QDRANT_URL"),
-        api_key=os.getenv("QDRANT_API_KEY"),
-        prefer_grpc=False 
-    )
-    model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-    return client, model, "tarento_knowledge"
+def initialize_search_cache():
+    # Shared by every session; invalidated when ingestion bumps the collection version
+    return RetrievalCache(max_entries=512, ttl=900)
 
-client_db, embed_model, COLLECTION_NAME = initialize_system()
+search_cache = initialize_search_cache()
+
+def current_sparse_model():
+    # Hybrid (dense + BM25) search switches on once ingestion stored sparse vectors;
+    # re-checked whenever ingestion bumps the collection version (a rebuild can flip it)
+    try:
+        hybrid = search_cache.versioned(
+            client_db, COLLECTION_NAME, "hybrid", lambda: is_hybrid_collection(client_db, COLLECTION_NAME)
+        )
+    except Exception:
+        return None
+    return get_sparse_model() if hybrid else None
+
+@st.cache_resource
+def initialize_reranker():
+    # Called on the first search, not at startup
+    if not (MULTI_QUERY and RERANK):
+        return None
+    try:
+        return get_reranker()
+    except Exception:
+        # Retrieval still works without it, just in vector-score order
+        return None
 
 # --- 3. HELPER FUNCTIONS ---
 
-def search_knowledge_base(query):
-    """Searches Qdrant and returns cleaned results with scores."""
+def search_knowledge_base(query, history=None, sections=None, content_types=None, include_noise=False):
+    """Searches Qdrant and returns (cleaned results with scores, query vector).
+
+    history (the chat messages) adds a condensed follow-up variant in
+    multi-query mode. sections / content_types scope the search (e.g.
+    sections=["case-studies"]); contact and legal pages are skipped unless
+    include_noise is set.
+    """
+    query_filter = build_filter(
+        sections=sections,
+        content_types=content_types,
+        exclude_content_types=None if include_noise else NOISE_CONTENT_TYPES,
+    )
     try:
-        query_vec = list(embed_model.embed([query]))[0].tolist()
-        results = client_db.query_points(
-            collection_name=COLLECTION_NAME,
-            query=query_vec,
-            limit=3,
-        ).points
-        
-        return [
-            {
-                "text": hit.payload.get("text", ""),
-                "url": hit.payload.get("source_url", ""),
-                "title": hit.payload.get("title", "Tarento Solution"),
-                "score": hit.score,
-            }
-            for hit in results
-        ]
+        embed_model = get_embed_model()
+        if MULTI_QUERY:
+            hits, query_vec, timings = multi_query_search(
+                client_db,
+                embed_model,
+                COLLECTION_NAME,
+                query,
+                limit=SEARCH_LIMIT,
+                history=history,
+                reranker=initialize_reranker(),
+                cache=search_cache,
+                default_title="Tarento Solution",
+                sparse_model=current_sparse_model(),
+                query_filter=query_filter,
+            )
+            st.session_state.retrieval_timings = timings
+            return hits, query_vec
+        return search_collection(
+            client_db,
+            embed_model,
+            COLLECTION_NAME,
+            query,
+            limit=SEARCH_LIMIT,
+            cache=search_cache,
+            default_title="Tarento Solution",
+            with_vector=True,
+            sparse_model=current_sparse_model(),
+            query_filter=query_filter,
+        )
     except Exception as e:
         st.error(f"Search Error: {e}")
-        return []
+        return [], None
 
-def get_response_and_link(prompt, context, instructions):
+def get_response_and_link(prompt, context, instructions, history, query_vector=None, chunk_ids=None):
     """Queries Gemini and extracts the source link if present."""
-    # Pass chat history if your get_assistant_response supports it
-    full_response = get_assistant_response(prompt, context, st.session_state.messages)
+    full_response = get_assistant_response(
+        prompt, context, history, query_vector=query_vector, chunk_ids=chunk_ids
+    )
     
     # Regex to find the link format used in the prompt instructions
     url_match = re.search(r"SOURCE_LINK:\s*(https?://[^\s\]\)\n]+)", full_response)
@@ -74,6 +161,15 @@ def get_response_and_link(prompt, context, instructions):
     clean_answer = re.sub(r"SOURCE_LINK:.*", "", full_response).strip()
     return clean_answer, source_url
 
+def stream_response_and_link(prompt, context, history, query_vector=None, chunk_ids=None):
+    """Streams the answer into the chat while stripping the SOURCE_LINK marker."""
+    link_filter = SourceLinkFilter()
+    tokens = stream_assistant_response(
+        prompt, context, history, query_vector=query_vector, chunk_ids=chunk_ids
+    )
+    answer = st.write_stream(link_filter.feed(tokens))
+    return (answer or "").strip(), link_filter.source_url
+
 def load_system_prompts():
     """Loads the agent's persona from docs_agent_prompt.py."""
     try:
@@ -92,6 +188,12 @@ st.image("https://www.tarento.com/images/logo.png", width=180)
 st.title("Tarento Knowledge Assistant")
 st.markdown("*Your expert guide to Tarento's Digital Transformation solutions.*")
 
+cache_stats = search_cache.stats()
+st.sidebar.caption(
+    f"Retrieval cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+    f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries"
+)
+
 # Display historical messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -106,31 +208,50 @@ if prompt := st.chat_input("How can Tarento help you today?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Assistant Response
-    with st.chat_message("assistant"):
+    # Assistant Response (TRACING=1 times every stage of the turn)
+    with st.chat_message("assistant"), start_trace("chat_turn", app="main", multi_query=MULTI_QUERY) as trace:
         with st.status("🔍 Consulting Knowledge Base...", expanded=False) as status:
-            citations = search_knowledge_base(prompt)
-            
-            if citations and citations[0]['score'] > 0.45: # Filter noise
-                context_text = "\n\n".join([f"Data: {c['text']} | Link: {c['url']}" for c in citations])
+            citations, query_vec = search_knowledge_base(prompt, history=st.session_state.messages)
+            if MULTI_QUERY and st.session_state.get("retrieval_timings"):
+                status.write(format_timings(st.session_state.retrieval_timings))
+
+            context_hits = apply_score_threshold(citations, CONTEXT_SCORE_THRESHOLD, gate="top") # Filter noise
+            with span("context.build"):
+                # Only the question-relevant sentences and recent turns that fit the token budgets
+                history, history_report = trim_history(st.session_state.messages, prompt)
+                packed = pack_context(prompt, context_hits)
+            if context_hits:
+                context_text = packed["text"]
+                context_ids = chunk_ids_for(context_hits)
+                status.write(format_report(packed, history_report))
                 status.update(label="Information retrieved.", state="complete")
             else:
                 context_text = "NO_CONTEXT_AVAILABLE"
+                context_ids = []
                 status.update(label="No specific documents found.", state="complete")
 
-        answer, primary_link = get_response_and_link(prompt, context_text, STRICT_INSTRUCTIONS)
-        
-        # Display clean text
-        st.markdown(answer)
+        # Near-identical questions over the same chunks reuse a cached answer
+        if STREAM_RESPONSES:
+            answer, primary_link = stream_response_and_link(
+                prompt, context_text, history, query_vector=query_vec, chunk_ids=context_ids
+            )
+        else:
+            answer, primary_link = get_response_and_link(
+                prompt, context_text, STRICT_INSTRUCTIONS, history, query_vector=query_vec, chunk_ids=context_ids
+            )
+            
+            # Display clean text
+            st.markdown(answer)
 
         # Handle Relevant Links (THE "HI" FIX)
         final_link = None
         final_title = ""
         
         if primary_link and citations:
-            best_match = citations[0]
+            # The closest vector match, wherever the reranker put it
+            best_match = max(citations, key=lambda hit: hit['score'])
             # Only show link if the database actually has a strong match
-            if best_match['score'] > 0.60:
+            if best_match['score'] > LINK_SCORE_THRESHOLD:
                 final_link = primary_link
                 final_title = best_match['title']
                 st.markdown(f"🔗 **[More about {final_title}]({final_link})**")
@@ -141,4 +262,16 @@ if prompt := st.chat_input("How can Tarento help you today?"):
             "content": answer, 
             "link": final_link, 
             "title": final_title
-        })
\ No newline at end of file
+        })
+        if trace is not None:
+            trace.attrs["context_hits"] = len(context_hits)
+            trace.attrs["prompt_tokens_saved"] = packed["saved_tokens"] + history_report["saved_tokens"]
+
+    if trace is not None:
+        st.session_state.last_trace = trace.summary()
+
+# --- 6. DEBUG PANEL ---
+if TRACING and st.session_state.get("last_trace"):
+    last_trace = st.session_state.last_trace
+    with st.sidebar.expander(f"Last turn: {last_trace['total_ms']:.0f} ms", expanded=False):
+        st.dataframe(stage_rows(last_trace), hide_index=True)
\ No newline at end of file
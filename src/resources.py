@@ -0,0 +1,134 @@
+"""Process-wide clients and models, built on first use.
+
+The chat apps, the ingesters and the agent all get their Qdrant client,
+embedding models and Groq client from here, so a Streamlit process that
+imports several of them still loads each ONNX model and opens each
+connection once. Heavy libraries (fastembed, groq, firecrawl) are only imported by
+the getter that needs them, which keeps `import` cheap.
+"""
+import os
+import threading
+
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+SPARSE_MODEL_NAME = "Qdrant/bm25"
+
+_instances = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def shared(key, factory):
+    """Returns the instance registered under key, calling factory() the first time.
+
+    Streamlit runs every session on its own thread, so construction is
+    guarded per key: concurrent first calls build one instance, and a slow
+    model load does not block unrelated getters.
+    """
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = _instances[key] = factory()
+    return instance
+
+
+def get_qdrant_client(url=None, api_key=None, prefer_grpc=False):
+    """Qdrant client for url (default QDRANT_URL); ":memory:" gives a local one."""
+    url = url or os.getenv("QDRANT_URL")
+    api_key = api_key or os.getenv("QDRANT_API_KEY")
+
+    def build():
+        from qdrant_client import QdrantClient
+
+        if url == ":memory:":
+            return QdrantClient(":memory:")
+        return QdrantClient(url=url, api_key=api_key, prefer_grpc=prefer_grpc)
+
+    return shared(("qdrant", url, api_key, prefer_grpc), build)
+
+
+def get_embed_model(model_name=EMBED_MODEL_NAME):
+    def build():
+        from fastembed import TextEmbedding
+
+        return TextEmbedding(model_name=model_name)
+
+    return shared(("embed", model_name), build)
+
+
+def get_sparse_model(model_name=SPARSE_MODEL_NAME):
+    def build():
+        from fastembed import SparseTextEmbedding
+
+        return SparseTextEmbedding(model_name=model_name)
+
+    return shared(("sparse", model_name), build)
+
+
+def get_llm_client(api_key=None):
+    """Async Groq client (connection pool, retries, fallback model) on its own event loop."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+
+    def build():
+        if __package__:
+            from .agent.llm import LLMClient
+        else:
+            from agent.llm import LLMClient
+
+        return LLMClient(api_key=api_key)
+
+    return shared(("llm", api_key), build)
+
+
+def get_firecrawl_client(api_key=None):
+    api_key = api_key or os.getenv("FIRECRAWL_API_KEY")
+
+    def build():
+        from firecrawl import Firecrawl
+
+        return Firecrawl(api_key=api_key)
+
+    return shared(("firecrawl", api_key), build)
+
+
+def get_reranker(model_name=None):
+    def build():
+        if __package__:
+            from .retrieval.multi_query import Reranker
+        else:
+            from retrieval.multi_query import Reranker
+
+        return Reranker(model_name) if model_name else Reranker()
+
+    return shared(("reranker", model_name), build)
+
+
+_warming = set()
+
+
+def warm_up(*getters):
+    """Builds resources on a background thread so the app can render meanwhile.
+
+    A request that needs one before it is ready simply waits on the same
+    per-key lock in shared(). Each getter is started once per process;
+    None entries are skipped, and failures surface on the first real call.
+    """
+    pending = [getter for getter in getters if getter is not None and getter not in _warming]
+    if not pending:
+        return None
+    _warming.update(pending)
+
+    def run():
+        for getter in pending:
+            try:
+                getter()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name="resource-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .versioning import get_collection_version
+
+
+def normalize_query(query):
+    """Case, whitespace and trailing punctuation do not change what we retrieve."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!.").strip().lower()
+
+
+class RetrievalCache:
+    """LRU + TTL cache of search results, keyed by (query, collection, limit, scope).
+
+    Entries are tagged with the collection version they were computed
+    against; once ingestion bumps the version they are dropped. The version
+    itself is re-read at most every version_check_interval seconds.
+    """
+
+    def __init__(self, max_entries=256, ttl=600, version_check_interval=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._derived = {}
+        # Streamlit runs every session on its own thread against one cache
+        self._lock = threading.Lock()
+
+    def _collection_version(self, client, collection_name):
+        now = time.monotonic()
+        version, checked_at = self._versions.get(collection_name, (None, 0.0))
+        if version is None or now - checked_at >= self.version_check_interval:
+            try:
+                version = get_collection_version(client, collection_name)
+            except Exception:
+                # Keep serving the last known version if Qdrant hiccups
+                version = 0 if version is None else version
+            self._versions[collection_name] = (version, now)
+        return version
+
+    def get(self, client, collection_name, query, limit, scope=None):
+        """Returns the cached value for this query, or None on a miss.
+
+        scope is any hashable describing a search filter; None means unfiltered.
+        """
+        key = (normalize_query(query), collection_name, limit, scope)
+        with self._lock:
+            version = self._collection_version(client, collection_name)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_version, results = entry
+                if expires_at > time.monotonic() and entry_version == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return results
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, client, collection_name, query, limit, results, scope=None):
+        key = (normalize_query(query), collection_name, limit, scope)
+        with self._lock:
+            version = self._collection_version(client, collection_name)
+            self._entries[key] = (time.monotonic() + self.ttl, version, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versioned(self, client, collection_name, name, compute):
+        """Returns compute(), re-run only once the collection version changes.
+
+        For facts about a collection that only ingestion changes, such as
+        whether it has sparse vectors. Exceptions propagate and are not cached.
+        """
+        with self._lock:
+            version = self._collection_version(client, collection_name)
+            entry = self._derived.get((collection_name, name))
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self._derived[(collection_name, name)] = (version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._derived.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,344 @@
+import math
+import os
+import re
+import time
+
+import numpy as np
+from qdrant_client import models
+
+from .search import DEFAULT_SEARCH_PARAMS, DENSE_VECTOR, HYBRID_PREFETCH_FACTOR, SPARSE_VECTOR
+
+try:
+    from ..tracing import add_timings
+except ImportError:
+    from tracing import add_timings
+
+# Everything after the cache lookup (embed, search, merge, rerank) should fit
+# in this many ms; the reranker only scores as many candidates as still fit.
+RETRIEVAL_BUDGET_MS = float(os.getenv("RETRIEVAL_BUDGET_MS", 600))
+# Each variant fetches this many candidates per requested hit before merging
+CANDIDATE_FACTOR = 3
+# Chunks of one page that may reach the prompt; citations collapse to one per URL
+MAX_CHUNKS_PER_URL = 2
+RERANK_MODEL_NAME = "Xenova/ms-marco-MiniLM-L-6-v2"
+# Recent user turns folded into the history-condensed variant
+HISTORY_TURNS = 2
+# Query requests per query_batch_points call when searching many questions at once
+BATCH_REQUESTS = 64
+
+QUESTION_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "do", "does", "did", "can", "could", "would",
+    "should", "what", "which", "who", "whom", "how", "why", "when", "where", "tell", "me", "about",
+    "please", "i", "you", "your", "we", "us", "of", "to", "in", "on", "for", "and", "or", "with",
+}
+
+
+def condense(question, history=None, history_turns=HISTORY_TURNS):
+    """question prefixed with the last few user turns, or None without earlier turns.
+
+    history is the chat's list of {"role", "content"} messages; the current
+    question may already be its last entry.
+    """
+    question = question.strip()
+    previous = [m["content"].strip() for m in history or [] if m.get("role") == "user" and m.get("content")]
+    if previous and previous[-1] == question:
+        previous = previous[:-1]
+    # Follow-ups like "and their pricing?" only retrieve well with the topic attached
+    return " ".join(previous[-history_turns:] + [question]) if previous else None
+
+
+def query_variants(question, history=None, history_turns=HISTORY_TURNS):
+    """Raw question, plus a history-condensed and a keyword-only rewrite when they differ.
+
+    No LLM call is involved, so the variants cost nothing against the latency budget.
+    """
+    question = question.strip()
+    variants = [question]
+    condensed = condense(question, history, history_turns)
+    if condensed:
+        variants.append(condensed)
+
+    keywords = [w for w in re.findall(r"[\w'-]+", question.lower()) if w not in QUESTION_WORDS]
+    if len(keywords) >= 2:
+        variants.append(" ".join(keywords))
+
+    return list(dict.fromkeys(variants))
+
+
+def dedupe_hits(hits, max_per_url=MAX_CHUNKS_PER_URL, max_items=None):
+    """Keeps the first hit per point ID and at most max_per_url hits per URL, in order."""
+    seen_ids, per_url, unique = set(), {}, []
+    for hit in hits:
+        url = hit.get("url")
+        if hit["id"] in seen_ids or (url and per_url.get(url, 0) >= max_per_url):
+            continue
+        seen_ids.add(hit["id"])
+        if url:
+            per_url[url] = per_url.get(url, 0) + 1
+        unique.append(hit)
+        if max_items and len(unique) >= max_items:
+            break
+    return unique
+
+
+class Reranker:
+    """Local cross-encoder that rescores (question, chunk) pairs.
+
+    Keeps a running ms-per-document estimate so callers can rerank only as
+    many candidates as fit in what is left of a latency budget.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL_NAME):
+        # Imported lazily: the apps only pay for it when reranking is on
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+        self.model = TextCrossEncoder(model_name=model_name)
+        self.ms_per_document = None
+        self.rerank("warm up", [{"text": "warm up"}])  # loads the ONNX session, seeds the estimate
+
+    def affordable(self, remaining_ms):
+        """How many documents can be reranked in remaining_ms."""
+        if self.ms_per_document is None:
+            return math.inf
+        return int(remaining_ms // max(self.ms_per_document, 1e-3))
+
+    def rerank(self, query, hits):
+        """Returns hits sorted by cross-encoder score, stored as hit["rerank_score"]."""
+        start = time.perf_counter()
+        scores = list(self.model.rerank(query, [hit["text"] for hit in hits]))
+        elapsed = (time.perf_counter() - start) * 1000 / max(len(hits), 1)
+        self.ms_per_document = elapsed if self.ms_per_document is None else 0.8 * self.ms_per_document + 0.2 * elapsed
+
+        reranked = [{**hit, "rerank_score": float(score)} for hit, score in zip(hits, scores)]
+        return sorted(reranked, key=lambda hit: hit["rerank_score"], reverse=True)
+
+
+def _batch_requests(variants, dense_vectors, sparse_model, candidates, named_vectors, search_params, query_filter):
+    if sparse_model is None:
+        return [
+            models.QueryRequest(
+                query=vector.tolist(),
+                using=DENSE_VECTOR if named_vectors else None,
+                limit=candidates,
+                params=search_params,
+                filter=query_filter,
+                with_payload=True,
+                with_vector=[DENSE_VECTOR] if named_vectors else True,
+            )
+            for vector in dense_vectors
+        ]
+
+    sparse_vectors = list(sparse_model.query_embed(variants))
+    prefetch_limit = max(candidates * HYBRID_PREFETCH_FACTOR, 20)
+    return [
+        models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    query=dense.tolist(), using=DENSE_VECTOR, limit=prefetch_limit,
+                    params=search_params, filter=query_filter,
+                ),
+                models.Prefetch(
+                    query=models.SparseVector(indices=sparse.indices.tolist(), values=sparse.values.tolist()),
+                    using=SPARSE_VECTOR,
+                    limit=prefetch_limit,
+                    filter=query_filter,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=candidates,
+            with_payload=True,
+            with_vector=[DENSE_VECTOR],
+        )
+        for dense, sparse in zip(dense_vectors, sparse_vectors)
+    ]
+
+
+def _merge(responses, query_vec, candidates, default_title, max_per_url):
+    merged = {}
+    # Round-robin over the variants so each one's best hits rank before anyone's tail
+    for rank in range(candidates):
+        for response in responses:
+            if rank >= len(response.points) or response.points[rank].id in merged:
+                continue
+            point = response.points[rank]
+            vector = point.vector[DENSE_VECTOR] if isinstance(point.vector, dict) else point.vector
+            merged[point.id] = {
+                "id": point.id,
+                "text": point.payload.get("text", ""),
+                "url": point.payload.get("source_url", ""),
+                "title": point.payload.get("title", default_title),
+                "score": float(np.dot(query_vec, vector)),
+                "content_hash": point.payload.get("content_hash"),
+            }
+    return dedupe_hits(merged.values(), max_per_url=max_per_url)
+
+
+def _rank(hits, question, history, reranker, remaining_ms=None):
+    """Reranks as many hits as fit in remaining_ms (all when None); returns (hits, reranked)."""
+    if reranker is None or len(hits) <= 1:
+        # Without a reranker, the best cosine match to the raw question goes first
+        return sorted(hits, key=lambda hit: hit["score"], reverse=True), 0
+    reranked = len(hits) if remaining_ms is None else min(len(hits), reranker.affordable(remaining_ms))
+    if reranked <= 1:
+        # No time to rerank: same order as without a reranker
+        return sorted(hits, key=lambda hit: hit["score"], reverse=True), 0
+    # The condensed variant carries a follow-up's topic
+    rerank_query = condense(question, history) or question
+    return reranker.rerank(rerank_query, hits[:reranked]) + hits[reranked:], reranked
+
+
+def multi_query_search(
+    client,
+    embed_model,
+    collection_name,
+    question,
+    limit,
+    history=None,
+    reranker=None,
+    cache=None,
+    default_title="Tarento Page",
+    sparse_model=None,
+    named_vectors=False,
+    search_params=None,
+    query_filter=None,
+    max_per_url=MAX_CHUNKS_PER_URL,
+    budget_ms=RETRIEVAL_BUDGET_MS,
+):
+    """Searches with every query variant in one batch, merges and reranks.
+
+    Returns (hits, query_vector, timings). Hits have the same shape as
+    search.search_collection's, and "score" stays the cosine similarity to
+    the raw question so the apps' thresholds keep their meaning; with a
+    reranker the order follows hit["rerank_score"]. timings maps each stage
+    to milliseconds, plus "reranked" (how many candidates were rescored).
+    """
+    start = time.perf_counter()
+    timings = {}
+
+    def lap(stage, since):
+        now = time.perf_counter()
+        timings[stage] = round((now - since) * 1000, 2)
+        return now
+
+    variants = query_variants(question, history)
+    scope = (tuple(variants), query_filter.model_dump_json(exclude_none=True) if query_filter is not None else None,
+             reranker is not None, max_per_url)
+    if cache is not None:
+        cached = cache.get(client, collection_name, question, limit, scope)
+        if cached is not None:
+            lap("cache", start)
+            timings["total"] = timings["cache"]
+            add_timings("retrieval", timings)
+            return cached[0][:], cached[1], timings
+    mark = lap("variants", start)
+
+    # One embedding batch and one Qdrant round trip for all variants
+    dense_vectors = list(embed_model.embed(variants))
+    mark = lap("embed", mark)
+
+    candidates = limit * CANDIDATE_FACTOR
+    requests = _batch_requests(
+        variants, dense_vectors, sparse_model, candidates,
+        named_vectors or sparse_model is not None, search_params or DEFAULT_SEARCH_PARAMS, query_filter,
+    )
+    remaining_s = max(budget_ms / 1000 - (mark - start), 0)
+    responses = client.query_batch_points(
+        collection_name=collection_name, requests=requests, timeout=max(1, math.ceil(remaining_s))
+    )
+    mark = lap("search", mark)
+
+    query_vec = dense_vectors[0]
+    hits = _merge(responses, query_vec, candidates, default_title, max_per_url)
+    mark = lap("merge", mark)
+
+    hits, reranked = _rank(hits, question, history, reranker, budget_ms - (mark - start) * 1000)
+    if reranker is not None:
+        mark = lap("rerank", mark)
+    hits = hits[:limit]
+
+    timings["reranked"] = reranked
+    timings["total"] = round((mark - start) * 1000, 2)
+    add_timings("retrieval", timings)
+    if cache is not None:
+        cache.put(client, collection_name, question, limit, (hits, query_vec), scope)
+    return hits, query_vec, timings
+
+
+def batch_multi_query_search(
+    client,
+    embed_model,
+    collection_name,
+    questions,
+    limit,
+    histories=None,
+    reranker=None,
+    default_title="Tarento Page",
+    sparse_model=None,
+    named_vectors=False,
+    search_params=None,
+    query_filter=None,
+    max_per_url=MAX_CHUNKS_PER_URL,
+    batch_requests=BATCH_REQUESTS,
+):
+    """multi_query_search for many questions at once, for offline runs.
+
+    The variants of all questions are embedded in one pass and searched
+    with one query_batch_points call per batch_requests variants; each
+    question is then merged and reranked like multi_query_search does,
+    without a latency budget. Returns (results, timings): results[i] is
+    (hits, query_vector, {"merge", "rerank"} ms) for questions[i], and
+    timings holds the batch-wide stages in ms.
+    """
+    start = time.perf_counter()
+    timings = {}
+
+    def lap(stage, since):
+        now = time.perf_counter()
+        timings[stage] = round((now - since) * 1000, 2)
+        return now
+
+    histories = histories or [None] * len(questions)
+    variants = [query_variants(question, history) for question, history in zip(questions, histories)]
+    flat = [variant for question_variants in variants for variant in question_variants]
+    mark = lap("variants", start)
+
+    dense_vectors = list(embed_model.embed(flat))
+    mark = lap("embed", mark)
+
+    candidates = limit * CANDIDATE_FACTOR
+    requests = _batch_requests(
+        flat, dense_vectors, sparse_model, candidates,
+        named_vectors or sparse_model is not None, search_params or DEFAULT_SEARCH_PARAMS, query_filter,
+    )
+    responses = []
+    for offset in range(0, len(requests), batch_requests):
+        responses += client.query_batch_points(
+            collection_name=collection_name, requests=requests[offset:offset + batch_requests]
+        )
+    mark = lap("search", mark)
+
+    results, offset = [], 0
+    for question, history, question_variants in zip(questions, histories, variants):
+        question_start = time.perf_counter()
+        query_vec = dense_vectors[offset]
+        hits = _merge(responses[offset:offset + len(question_variants)], query_vec, candidates, default_title, max_per_url)
+        merged = time.perf_counter()
+        hits, _ = _rank(hits, question, history, reranker)
+        results.append((hits[:limit], query_vec, {
+            "merge": round((merged - question_start) * 1000, 2),
+            "rerank": round((time.perf_counter() - merged) * 1000, 2),
+        }))
+        offset += len(question_variants)
+    mark = lap("rank", mark)
+
+    timings["total"] = round((mark - start) * 1000, 2)
+    return results, timings
+
+
+def format_timings(timings):
+    """One-line summary of multi_query_search timings for the apps' status panel."""
+    stages = " · ".join(
+        f"{stage} {ms:.0f} ms" for stage, ms in timings.items() if stage not in ("total", "reranked")
+    )
+    reranked = f", {timings['reranked']} reranked" if timings.get("reranked") else ""
+    return f"Retrieval {timings['total']:.0f} ms ({stages}{reranked})"
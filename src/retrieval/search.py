@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+from qdrant_client import models
+
+try:
+    from ..ingest.payload_fields import path_prefixes
+    from ..tracing import span
+except ImportError:
+    # Imported as retrieval.search with src/ on sys.path (both apps, benchmarks)
+    from ingest.payload_fields import path_prefixes
+    from tracing import span
+
+# Vector names ingest.pipeline.ensure_collection(hybrid=True) creates
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "bm25"
+# Each hybrid leg fetches this many candidates per requested hit before fusion
+HYBRID_PREFETCH_FACTOR = 4
+
+# Query-side accuracy/speed knobs. hnsw_ef widens the graph search (Qdrant
+# defaults it to ef_construct); on a quantized collection the best
+# limit * oversampling candidates are rescored with the float32 vectors.
+SEARCH_HNSW_EF = int(os.getenv("SEARCH_HNSW_EF", 0)) or None
+QUANTIZATION_OVERSAMPLING = float(os.getenv("QUANTIZATION_OVERSAMPLING", 2.0))
+
+
+def make_search_params(hnsw_ef=SEARCH_HNSW_EF, oversampling=QUANTIZATION_OVERSAMPLING, rescore=True, exact=False):
+    # Quantization params are ignored by collections that are not quantized
+    return models.SearchParams(
+        hnsw_ef=hnsw_ef,
+        exact=exact,
+        quantization=models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling),
+    )
+
+
+DEFAULT_SEARCH_PARAMS = make_search_params()
+# Footer page types (see ingest/payload_fields.py) the apps leave out unless asked for
+NOISE_CONTENT_TYPES = ("contact", "legal")
+
+
+def build_filter(sections=None, content_types=None, exclude_content_types=None, path_prefix=None):
+    """Qdrant filter over the derived payload fields, or None when unscoped.
+
+    path_prefix like "/case-studies/anuvaad" matches pages at or below that path.
+    """
+    must, must_not = [], []
+    if sections:
+        must.append(models.FieldCondition(key="section", match=models.MatchAny(any=list(sections))))
+    if content_types:
+        must.append(models.FieldCondition(key="content_type", match=models.MatchAny(any=list(content_types))))
+    prefixes = path_prefixes(path_prefix or "")
+    if prefixes:
+        # path_prefixes holds every leading path of a page, so one keyword match
+        # selects the pages at or below the prefix (and nothing that merely
+        # contains the same segments elsewhere in its path)
+        must.append(models.FieldCondition(key="path_prefixes", match=models.MatchValue(value=prefixes[-1])))
+    if exclude_content_types:
+        must_not.append(
+            models.FieldCondition(key="content_type", match=models.MatchAny(any=list(exclude_content_types)))
+        )
+    if not must and not must_not:
+        return None
+    return models.Filter(must=must or None, must_not=must_not or None)
+
+
+def is_hybrid_collection(client, collection_name):
+    """True if the collection (or the one an alias points at) has dense + BM25 vectors."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == collection_name:
+            collection_name = alias.collection_name
+            break
+    return bool(client.get_collection(collection_name).config.params.sparse_vectors)
+
+
+def _hybrid_query(client, collection_name, query, query_vec, sparse_model, limit, search_params, query_filter):
+    sparse = next(iter(sparse_model.query_embed(query)))
+    candidates = max(limit * HYBRID_PREFETCH_FACTOR, 20)
+    results = client.query_points(
+        collection_name=collection_name,
+        prefetch=[
+            models.Prefetch(
+                query=query_vec.tolist(), using=DENSE_VECTOR, limit=candidates, params=search_params, filter=query_filter
+            ),
+            models.Prefetch(
+                query=models.SparseVector(indices=sparse.indices.tolist(), values=sparse.values.tolist()),
+                using=SPARSE_VECTOR,
+                limit=candidates,
+                filter=query_filter,
+            ),
+        ],
+        query=models.FusionQuery(fusion=models.Fusion.RRF),
+        limit=limit,
+        with_vectors=[DENSE_VECTOR],
+    ).points
+    # RRF scores are rank-based (~1/60), so report each hit's cosine similarity
+    # instead; the apps' score thresholds keep their meaning in hybrid mode.
+    return [
+        (hit, float(np.dot(query_vec, hit.vector[DENSE_VECTOR])))
+        for hit in results
+    ]
+
+
+def search_collection(
+    client,
+    embed_model,
+    collection_name,
+    query,
+    limit,
+    cache=None,
+    default_title="Tarento Page",
+    with_vector=False,
+    sparse_model=None,
+    named_vectors=False,
+    search_params=None,
+    query_filter=None,
+):
+    """Embeds query and returns the top hits as plain dicts.
+
+    With a RetrievalCache, repeated queries skip both the embedding and the
+    Qdrant round trip. with_vector=True returns (hits, query_vector) so
+    callers can reuse the embedding. Passing a sparse_model runs hybrid
+    search (dense + BM25 fused with RRF) on a hybrid collection;
+    named_vectors=True runs dense-only search against one. search_params
+    defaults to DEFAULT_SEARCH_PARAMS (see make_search_params); query_filter
+    (see build_filter) restricts the search to matching pages.
+    """
+    scope = query_filter.model_dump_json(exclude_none=True) if query_filter is not None else None
+    if cache is not None:
+        with span("retrieval.cache"):
+            cached = cache.get(client, collection_name, query, limit, scope)
+        if cached is not None:
+            hits, query_vec = cached[0][:], cached[1]
+            return (hits, query_vec) if with_vector else hits
+
+    with span("retrieval.embed"):
+        query_vec = next(iter(embed_model.embed([query])))
+    search_params = search_params or DEFAULT_SEARCH_PARAMS
+    with span("retrieval.search"):
+        if sparse_model is not None:
+            results = _hybrid_query(
+                client, collection_name, query, query_vec, sparse_model, limit, search_params, query_filter
+            )
+        else:
+            points = client.query_points(
+                collection_name=collection_name,
+                query=query_vec,
+                using=DENSE_VECTOR if named_vectors else None,
+                limit=limit,
+                search_params=search_params,
+                query_filter=query_filter,
+            ).points
+            results = [(hit, hit.score) for hit in points]
+
+    hits = [
+        {
+            "id": hit.id,
+            "text": hit.payload.get("text", ""),
+            "url": hit.payload.get("source_url", ""),
+            "title": hit.payload.get("title", default_title),
+            "score": score,
+            "content_hash": hit.payload.get("content_hash"),
+        }
+        for hit, score in results
+    ]
+    if cache is not None:
+        cache.put(client, collection_name, query, limit, (hits, query_vec), scope)
+    return (hits, query_vec) if with_vector else hits
+
+
+def apply_score_threshold(hits, threshold, gate="each"):
+    """Drops hits that are not relevant enough to go into the prompt.
+
+    gate="each" keeps every hit scoring above threshold (the Docling UI);
+    gate="top" keeps all hits if the best one clears it, else none (src/main.py).
+    Scores are vector similarities; after a rerank the best one need not be first.
+    """
+    if gate == "top":
+        return hits if hits and max(hit["score"] for hit in hits) > threshold else []
+    return [hit for hit in hits if hit["score"] > threshold]
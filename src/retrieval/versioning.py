@@ -0,0 +1,46 @@
+import time
+import uuid
+
+from qdrant_client import models
+
+# One tiny point per data collection; ingestion bumps it whenever the data
+# changes so long-lived apps know their cached search results are stale.
+VERSIONS_COLLECTION = "collection_versions"
+
+
+def _version_point_id(collection_name):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"qdrant-collection:{collection_name}"))
+
+
+def get_collection_version(client, collection_name):
+    if not client.collection_exists(VERSIONS_COLLECTION):
+        return 0
+    points = client.retrieve(
+        collection_name=VERSIONS_COLLECTION,
+        ids=[_version_point_id(collection_name)],
+        with_payload=True,
+    )
+    return points[0].payload.get("version", 0) if points else 0
+
+
+def bump_collection_version(client, collection_name):
+    """Marks collection_name as changed and returns its new version number."""
+    if not client.collection_exists(VERSIONS_COLLECTION):
+        client.create_collection(
+            collection_name=VERSIONS_COLLECTION,
+            vectors_config=models.VectorParams(size=1, distance=models.Distance.DOT),
+        )
+
+    version = get_collection_version(client, collection_name) + 1
+    client.upsert(
+        collection_name=VERSIONS_COLLECTION,
+        points=[
+            models.PointStruct(
+                id=_version_point_id(collection_name),
+                vector=[1.0],
+                payload={"collection": collection_name, "version": version, "updated_at": time.time()},
+            )
+        ],
+        wait=True,
+    )
+    return version
@@ -0,0 +1,208 @@
+"""Timed spans around the stages of a chat turn or an ingestion run.
+
+TRACING=1 turns it on. Each finished trace is written as one JSON line to
+the "tarento.trace" logger (stderr, or TRACE_LOG=<path>) and, with
+METRICS_PORT set and prometheus_client installed, exported as Prometheus
+histograms. With tracing off, span() and friends return shared no-op
+objects, so instrumented code pays one ContextVar lookup per call.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+TRACING = os.getenv("TRACING") == "1"
+TRACE_LOG = os.getenv("TRACE_LOG")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0)) or None
+
+logger = logging.getLogger("tarento.trace")
+_current = ContextVar("trace", default=None)
+_NOOP = nullcontext()
+_setup_lock = threading.Lock()
+_metrics = None
+
+
+class Trace:
+    """Stage timings of one unit of work.
+
+    Stages are keyed by name and accumulate, so a per-batch span inside a
+    loop becomes one stage with a count. Times are exclusive: a span nested
+    in another is subtracted from its parent, so the stages add up to the
+    traced wall time.
+    """
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.stages = {}
+        self.total_ms = None
+        self._start = time.perf_counter()
+        self._stack = []
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            child_ms = self._stack.pop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record(name, elapsed_ms - child_ms, 1)
+            if self._stack:
+                self._stack[-1] += elapsed_ms
+
+    def add(self, name, ms, count=1):
+        """Records ms spent in stage name, measured elsewhere inside the current span."""
+        self._record(name, ms, count)
+        if self._stack:
+            self._stack[-1] += ms
+
+    def _record(self, name, ms, count):
+        stage = self.stages.setdefault(name, [0, 0.0])
+        stage[0] += count
+        stage[1] += ms
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        return self
+
+    def summary(self):
+        return {
+            "trace": self.name,
+            **self.attrs,
+            "total_ms": round(self.total_ms, 2) if self.total_ms is not None else None,
+            "stages": {name: {"count": count, "ms": round(ms, 2)} for name, (count, ms) in self.stages.items()},
+        }
+
+
+def current():
+    """The active Trace, or None when tracing is off or nothing is being traced."""
+    return _current.get()
+
+
+@contextmanager
+def start_trace(name, **attrs):
+    """Traces the block as name, unless tracing is off or a trace is already active.
+
+    Yields the Trace (None when not tracing); it is logged when the block exits.
+    """
+    if not TRACING or _current.get() is not None:
+        yield _current.get()
+        return
+    trace = Trace(name, **attrs)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        _emit(trace.finish())
+
+
+def traced(name, **attrs):
+    """Decorator: runs the function inside start_trace(name, **attrs)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_trace(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def span(name):
+    """Context manager timing a stage of the active trace (no-op without one)."""
+    trace = _current.get()
+    return _NOOP if trace is None else trace.span(name)
+
+
+def add(name, ms, count=1):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, ms, count)
+
+
+def add_timings(prefix, timings):
+    """Adds a {stage: ms} dict (e.g. multi_query_search's) under prefix."""
+    trace = _current.get()
+    if trace is not None:
+        for stage, ms in timings.items():
+            if stage != "total" and isinstance(ms, float):
+                trace.add(f"{prefix}.{stage}", ms)
+
+
+def timed_iter(iterable, name):
+    """Iterates iterable, timing every next() as stage name (e.g. a lazy upstream)."""
+    if _current.get() is None:
+        return iterable
+    return _timed_iter(iterable, name)
+
+
+def _timed_iter(iterable, name):
+    iterator = iter(iterable)
+    while True:
+        trace = _current.get()
+        with trace.span(name) if trace is not None else _NOOP:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def stage_rows(summary):
+    """Table rows (slowest stage first) of a trace summary, for the debug panels."""
+    total = summary.get("total_ms") or 0.0
+    rows = [
+        {"stage": name, "calls": stage["count"], "ms": stage["ms"], "share": f"{stage['ms'] / total:.0%}" if total else "-"}
+        for name, stage in summary["stages"].items()
+    ]
+    return sorted(rows, key=lambda row: row["ms"], reverse=True)
+
+
+def _emit(trace):
+    _setup()
+    summary = trace.summary()
+    logger.info(json.dumps(summary, default=str))
+    if _metrics:
+        stage_seconds, total_seconds = _metrics
+        for stage, (_, ms) in trace.stages.items():
+            stage_seconds.labels(trace=trace.name, stage=stage).observe(ms / 1000)
+        total_seconds.labels(trace=trace.name).observe(trace.total_ms / 1000)
+
+
+def _setup():
+    global _metrics
+    if logger.handlers and _metrics is not None:
+        return
+    with _setup_lock:
+        if not logger.handlers:
+            handler = logging.FileHandler(TRACE_LOG, encoding="utf-8") if TRACE_LOG else logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        if _metrics is None:
+            _metrics = _start_metrics() or False
+
+
+def _start_metrics():
+    if not METRICS_PORT:
+        return None
+    try:
+        # Optional dependency: pip install prometheus_client
+        from prometheus_client import Histogram, start_http_server
+    except ImportError:
+        logger.warning("METRICS_PORT is set but prometheus_client is not installed; metrics disabled")
+        return None
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    metrics = (
+        Histogram("tarento_stage_seconds", "Time spent per traced stage", ["trace", "stage"], buckets=buckets),
+        Histogram("tarento_trace_seconds", "Wall time per trace", ["trace"], buckets=buckets),
+    )
+    start_http_server(METRICS_PORT)
+    return metrics
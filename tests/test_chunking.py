@@ -0,0 +1,112 @@
+import re
+
+from ingest.chunking import Chunker
+
+MAX_TOKENS = 20
+OVERLAP_TOKENS = 5
+
+
+def count_tokens(text):
+    # One token per word keeps the budgets easy to reason about
+    return len(text.split())
+
+
+def make_chunker(min_tokens=4):
+    return Chunker(
+        count_tokens=count_tokens,
+        max_tokens=MAX_TOKENS,
+        overlap_tokens=OVERLAP_TOKENS,
+        min_tokens=min_tokens,
+    )
+
+
+def sentence(words, prefix):
+    return " ".join(f"{prefix}{i}" for i in range(words)) + "."
+
+
+def test_empty_text_has_no_chunks():
+    assert make_chunker().split("") == []
+    assert make_chunker().split("\n\n  \n\n") == []
+
+
+def test_short_text_is_one_chunk():
+    text = sentence(5, "a") + "\n\n" + sentence(5, "b")
+    assert make_chunker().split(text) == [text]
+
+
+def test_chunks_stay_within_budget_and_keep_every_word():
+    text = " ".join(sentence(6, f"s{k}w") for k in range(10))
+    chunks = make_chunker().split(text)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
+    assert {word for chunk in chunks for word in chunk.split()} == set(text.split())
+
+
+def test_neighbouring_chunks_share_an_overlap():
+    sentences = [sentence(4, f"s{k}w") for k in range(8)]
+    chunks = make_chunker().split(" ".join(sentences))
+
+    assert chunks[0] == " ".join(sentences[:5])
+    # The last sentence of a chunk (4 tokens, within the overlap budget) opens the next
+    assert chunks[1] == " ".join(sentences[4:])
+
+
+def test_heading_starts_a_new_chunk_without_overlap():
+    text = sentence(6, "a") + "\n\n## Next\n\n" + sentence(6, "b")
+    chunks = make_chunker().split(text)
+
+    assert chunks == [sentence(6, "a"), "## Next\n\n" + sentence(6, "b")]
+
+
+def test_tiny_chunk_is_folded_into_the_previous_one():
+    tail = "## Contact\nMail us."
+    assert make_chunker(min_tokens=6).split(sentence(10, "a") + "\n\n" + tail) == [
+        sentence(10, "a") + "\n\n" + tail
+    ]
+    # Unless the merged chunk would go over the budget
+    assert make_chunker(min_tokens=6).split(sentence(18, "a") + "\n\n" + tail) == [sentence(18, "a"), tail]
+
+
+def test_run_on_text_falls_back_to_words():
+    words = [f"w{i}" for i in range(50)]
+    chunks = make_chunker().split(" ".join(words))
+
+    assert [count_tokens(chunk) for chunk in chunks] == [20, 20, 10]
+    assert " ".join(chunks).split() == words
+
+
+def test_heading_moves_to_the_chunk_it_introduces():
+    text = sentence(3, "a") + "\n\n## Heading\n\n" + sentence(17, "b")
+    chunks = make_chunker().split(text)
+
+    # The 3-token block is under min_tokens, so the heading and the start of its text join it
+    assert chunks[0] == sentence(3, "a") + "\n\n## Heading\n\n" + " ".join(f"b{i}" for i in range(15))
+    assert chunks[1].endswith("b15 b16.")
+    assert all(count_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
+
+
+def test_small_block_is_not_flushed_before_a_full_one():
+    blocks = [sentence(2, "a"), " ".join([sentence(6, "b"), sentence(6, "c"), sentence(7, "d")]), sentence(3, "e")]
+    chunks = make_chunker().split("\n\n".join(blocks))
+
+    assert all(4 <= count_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
+    assert chunks[0].startswith(sentence(2, "a") + "\n\n" + sentence(6, "b"))
+
+
+def test_heading_stays_with_a_sentence_that_fills_the_budget():
+    chunks = make_chunker().split(sentence(10, "a") + "\n\n## Sub\n\n" + sentence(20, "b"))
+
+    assert "## Sub" not in chunks
+    assert any(chunk.startswith("## Sub\n\nb0 b1") for chunk in chunks)
+    assert all(count_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
+
+
+def test_heading_is_not_left_alone_when_its_block_only_fits_without_it():
+    # 19 tokens: fits the budget alone, not after the 2-token heading
+    body = " ".join([sentence(6, "s0w"), sentence(6, "s1w"), sentence(7, "s2w")])
+    chunks = make_chunker().split(sentence(10, "a") + "\n\n## Heading\n\n" + body)
+
+    assert chunks[1].startswith("## Heading\n\n" + sentence(6, "s0w"))
+    assert not any(re.fullmatch(r"#+\s[^\n]*", chunk) for chunk in chunks)
+    assert all(count_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
@@ -0,0 +1,35 @@
+from agent.context import trim_history
+
+LONG_ANSWER = "Anuvaad is an open source translation platform. " * 200
+
+
+def test_long_last_answer_is_cut_instead_of_dropping_the_history():
+    history = [
+        {"role": "user", "content": "What is Anuvaad?"},
+        {"role": "assistant", "content": LONG_ANSWER},
+        {"role": "user", "content": "Tell me more about that"},
+    ]
+    messages, report = trim_history(history, "Tell me more about that", budget_tokens=100)
+
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[0]["content"] == "What is Anuvaad?"
+    assert messages[1]["content"].startswith("Anuvaad is an open source translation platform.")
+    assert messages[1]["content"].endswith("…")
+    assert report["tokens"] <= 100
+
+
+def test_older_turns_fill_the_remaining_budget():
+    history = [
+        {"role": "user", "content": "Who founded Tarento?"},
+        {"role": "assistant", "content": "x" * 2000},
+        {"role": "user", "content": "Where is it based?"},
+        {"role": "assistant", "content": "Bangalore."},
+        {"role": "user", "content": "What is Anuvaad?"},
+        {"role": "assistant", "content": "A translation platform."},
+    ]
+    messages, report = trim_history(history, "And Karmayogi?", budget_tokens=100)
+
+    assert [m["content"] for m in messages] == [
+        "Where is it based?", "Bangalore.", "What is Anuvaad?", "A translation platform.",
+    ]
+    assert report["tokens"] <= 100
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from ingest.firecrawl_jobs import JOB_RETENTION, CrawlJobManager, CrawlTimeout
+
+URL = "https://www.tarento.com"
+
+
+def document(path):
+    return {"markdown": f"# {path}", "metadata": {"source_url": URL + path, "title": path, "status_code": 200}}
+
+
+class FakeFirecrawl:
+    """Jobs finish after `polls_to_finish` status calls; unknown job IDs raise like an expired job."""
+
+    def __init__(self, polls_to_finish=3):
+        self.polls_to_finish = polls_to_finish
+        self.jobs = {}
+        self.started = []
+
+    def start_crawl(self, url, limit, scrape_options):
+        job_id = f"job-{len(self.started) + 1}"
+        self.started.append((url, limit))
+        self.jobs[job_id] = 0
+        return {"id": job_id}
+
+    def get_crawl_status(self, job_id, pagination_config=None, request_timeout=None):
+        if job_id not in self.jobs:
+            raise RuntimeError(f"Job not found: {job_id}")
+        self.jobs[job_id] += 1
+        polls = self.jobs[job_id]
+        done = polls >= self.polls_to_finish
+        return {
+            "status": "completed" if done else "scraping",
+            "completed": polls,
+            "total": self.polls_to_finish,
+            "data": [document(f"/page-{i}") for i in range(polls)],
+            "next": None,
+        }
+
+    def get_crawl_status_page(self, next_url, request_timeout=None):
+        raise AssertionError("no pagination in these tests")
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += seconds
+
+
+def make_manager(client, state_path, source="firecrawl", timeout=60.0, now=lambda: 1_000_000.0):
+    clock = FakeClock()
+    return CrawlJobManager(
+        client, source=source, timeout=timeout, state_path=state_path,
+        sleep=clock.sleep, clock=clock, now=now, log=lambda *args: None,
+    )
+
+
+def test_timed_out_job_is_resumed_by_the_next_run(tmp_path):
+    client = FakeFirecrawl(polls_to_finish=10)
+    state_path = tmp_path / "jobs.json"
+    first = make_manager(client, state_path, timeout=5.0)
+    job_id, resumed = first.resume_or_start(URL, limit=20)
+    assert not resumed
+
+    with pytest.raises(CrawlTimeout):
+        list(first.pages(job_id))
+
+    second = make_manager(client, state_path)
+    assert second.resume_or_start(URL, limit=20) == (job_id, True)
+    assert [page["url"] for page in second.pages(job_id)] == [URL + f"/page-{i}" for i in range(10)]
+    assert len(client.started) == 1
+
+
+def test_saved_job_is_not_resumed_by_another_source_or_limit(tmp_path):
+    client = FakeFirecrawl()
+    state_path = tmp_path / "jobs.json"
+    job_id, _ = make_manager(client, state_path, source="firecrawl").resume_or_start(URL, limit=20)
+
+    other, resumed = make_manager(client, state_path, source="firecrawl_clean").resume_or_start(URL, limit=30)
+    assert not resumed and other != job_id
+    assert make_manager(client, state_path, source="firecrawl").saved_job(URL, limit=30) is None
+    assert client.started == [(URL, 20), (URL, 30)]
+
+
+def test_expired_saved_job_starts_a_new_crawl(tmp_path):
+    client = FakeFirecrawl()
+    state_path = tmp_path / "jobs.json"
+    state_path.write_text(json.dumps({
+        f"firecrawl:{URL}": {"job_id": "job-expired", "limit": 20, "started_at": 1_000_000.0},
+    }))
+
+    manager = make_manager(client, state_path)
+    job_id, resumed = manager.resume_or_start(URL, limit=20)
+
+    assert not resumed and job_id != "job-expired"
+    assert json.loads(state_path.read_text())[f"firecrawl:{URL}"]["job_id"] == job_id
+
+
+def test_jobs_past_retention_are_dropped_without_a_lookup(tmp_path):
+    client = FakeFirecrawl()
+    state_path = tmp_path / "jobs.json"
+    state_path.write_text(json.dumps({
+        f"firecrawl:{URL}": {"job_id": "job-old", "limit": 20, "started_at": 0.0},
+        URL: "job-unversioned",
+    }))
+    client.jobs["job-old"] = 0
+
+    manager = make_manager(client, state_path, now=lambda: JOB_RETENTION + 1)
+    assert manager.saved_job(URL, limit=20) is None
+    job_id, resumed = manager.resume_or_start(URL, limit=20)
+
+    assert not resumed and client.jobs["job-old"] == 0
+    assert list(json.loads(state_path.read_text())) == [f"firecrawl:{URL}"]
@@ -0,0 +1,26 @@
+from agent.streaming import SourceLinkFilter
+
+URL = "https://www.tarento.com/case-studies/anuvaad"
+
+
+def stream(tokens):
+    link_filter = SourceLinkFilter()
+    return "".join(link_filter.feed(tokens)), link_filter.source_url
+
+
+def test_marker_split_across_tokens_is_removed():
+    text, url = stream(["Anuvaad translates documents.\nSOURCE", "_LI", f"NK: {URL}", "\nThanks!"])
+
+    assert text == "Anuvaad translates documents.\n\nThanks!"
+    assert url == URL
+
+
+def test_url_on_the_line_after_the_marker():
+    text, url = stream(["Anuvaad translates documents.\n", "SOURCE_LINK:", "\n", " ", URL[:20], URL[20:], "\n"])
+
+    assert text == "Anuvaad translates documents.\n\n"
+    assert url == URL
+
+
+def test_answer_without_marker_is_unchanged():
+    assert stream(["No SOURCE", " here."]) == ("No SOURCE here.", None)